@@ -0,0 +1,65 @@
+"""
+Benchmark the time taken to import elasticbatch in a fresh interpreter
+
+Usage:
+    $ python benchmarks/import_time.py [--runs N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+STATEMENTS = {
+    'python startup': 'pass',
+    'import elasticbatch': 'import elasticbatch',
+    'create ElasticBuffer': 'import elasticbatch; elasticbatch.ElasticBuffer()',
+    'import elasticsearch': 'import elasticsearch',
+    'import pandas': 'import pandas',
+}
+
+HEAVY_MODULES = ('elasticsearch', 'pandas', 'numpy')
+
+
+def time_statement(statement: str, runs: int) -> float:
+    """
+    Return median wall time in seconds of running a statement in a fresh interpreter
+    :param statement: Python statement to run
+    :param runs: number of times to run the statement
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def loaded_heavy_modules(statement: str) -> list:
+    """
+    Return heavy modules that are imported as a result of running a statement
+    :param statement: Python statement to run
+    """
+    loaded = f'",".join(m for m in {HEAVY_MODULES} if m in sys.modules)'
+    check = f'import sys; {statement}; print({loaded})'
+    out = subprocess.run([sys.executable, '-c', check], check=True, stdout=subprocess.PIPE)
+    return [mod for mod in out.stdout.decode().strip().split(',') if mod]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=20, help='number of runs per statement')
+    args = parser.parse_args()
+
+    for name, statement in STATEMENTS.items():
+        try:
+            median = time_statement(statement, args.runs)
+        except subprocess.CalledProcessError:
+            print(f'{name:<24} failed (is the package installed?)')
+            continue
+        modules = loaded_heavy_modules(statement)
+        print(f'{name:<24} {1000 * median:8.1f} ms   loads: {", ".join(modules) or "-"}')
+
+
+if __name__ == '__main__':
+    main()
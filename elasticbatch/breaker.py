@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import Callable
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker used by elasticbatch.ElasticBuffer to fail fast when Elasticsearch is
+    unavailable. The breaker starts closed, allowing all flushes. After failure_threshold
+    consecutive failures it opens, and flushes fail immediately without contacting Elasticsearch.
+    Once reset_timeout seconds have passed it becomes half-open, allowing a single flush at a time
+    to probe Elasticsearch: success closes the breaker while failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        probe_timeout: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        :param failure_threshold: number of consecutive failures after which the breaker opens
+        :param reset_timeout: number of seconds the breaker stays open before allowing a probe
+        :param probe_timeout: request timeout in seconds for probing Elasticsearch when half-open
+        :param clock: function returning monotonic time in seconds
+        """
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold must be at least 1')
+        if reset_timeout < 0:
+            raise ValueError('reset_timeout must be non-negative')
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = self.CLOSED
+        self._n_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def __str__(self):
+        return f'{self.__class__.__name__} ({self.state})'
+
+    @property
+    def state(self) -> str:
+        """
+        Get current state of the breaker: one of closed, open, half_open
+        """
+        with self._lock:
+            return self._current_state()
+
+    def allow_request(self) -> bool:
+        """
+        Return whether a request should be attempted, claiming the probe when half-open
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.OPEN or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        """
+        Record a successful request, closing the breaker
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._n_failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed request, opening the breaker if the failure threshold is reached or if the
+        request was a probe
+        """
+        with self._lock:
+            self._n_failures += 1
+            if self._probing or self._n_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """
+        Release the probe claimed by allow_request without recording a result (e.g., when the
+        request was not attempted due to an unrelated error), allowing another probe
+        """
+        with self._lock:
+            self._probing = False
+
+    def _current_state(self) -> str:
+        """
+        Return state, transitioning from open to half-open after the reset timeout; must be called
+        while holding the lock
+        """
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
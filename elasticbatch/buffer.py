@@ -1,18 +1,48 @@
+import copy
+import itertools
 import json
 import math
 import os
 import time
-from typing import Any, Callable, Dict, List, Optional
-
-from elasticsearch import Elasticsearch, ElasticsearchException
-from elasticsearch.helpers import bulk
-
-from elasticbatch.exceptions import ElasticBufferFlushError
-from elasticbatch.types import DocumentBundle, no_pandas
+from array import array
+from contextlib import contextmanager, nullcontext
+from typing import (TYPE_CHECKING, Any, Callable, ContextManager, Dict, Hashable, Iterable,
+                    Iterator, List, Optional, Sequence, Set, Tuple)
+
+from elasticbatch import frames, ops
+from elasticbatch.breaker import CircuitBreaker
+from elasticbatch.checkpoint import OffsetTracker, SourcePosition
+from elasticbatch.exceptions import (ElasticBatchError, ElasticBufferCircuitOpenError,
+                                     ElasticBufferFlushError)
+from elasticbatch.ids import IdStrategy
+from elasticbatch.indices import IndexSettingsTuner
+from elasticbatch.metadata import CachedMetadataFunc
+from elasticbatch.pipeline import Stage, run_pipeline
+from elasticbatch.stats import weighted_percentiles
+from elasticbatch.targets import Target, encode_chunks, send_chunks
+from elasticbatch.throttle import Throttle
+from elasticbatch.tracing import TracedClient, Tracer
+
+if TYPE_CHECKING:
+    from elasticbatch.types import DocumentBundle
+
+# context manager used in place of a span when tracing is disabled
+_NO_SPAN = nullcontext()
+
+
+def bulk(client: Any, actions: Iterable[Dict], **kwargs: Any) -> Tuple[int, Any]:
+    """
+    Call elasticsearch.helpers.bulk, importing it only when first needed
+    """
+    from elasticsearch.helpers import bulk as _bulk
+    return _bulk(client, actions, **kwargs)
 
 
 class ElasticBuffer:
 
+    # percentiles of queue latency reported for each flush
+    latency_percentiles = (50, 95, 99)
+
     def __init__(
         self,
         size: int = 5000,
@@ -20,6 +50,19 @@ class ElasticBuffer:
         bulk_kwargs: Optional[Dict[str, Any]] = None,
         verbose_errs: bool = True,
         dump_dir: Optional[str] = None,
+        columnar: bool = False,
+        linger: Optional[float] = None,
+        throttle: Optional[Throttle] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        op_type: str = ops.INDEX,
+        stages: Optional[Sequence[Stage]] = None,
+        null_values: str = 'drop',
+        datetime_format: str = 'iso',
+        tracer: Optional[Tracer] = None,
+        targets: Optional[Sequence[Target]] = None,
+        lanes: Optional[Dict[str, Dict[str, Any]]] = None,
+        id_strategy: Optional[IdStrategy] = None,
+        on_commit: Optional[Callable[[Dict[Hashable, Any]], None]] = None,
         **metadata_funcs: Callable[[Dict], Any],
     ) -> None:
         """
@@ -28,7 +71,45 @@ class ElasticBuffer:
         :param bulk_kwargs: dict of kwargs for elasticsearch.helpers.bulk insertion
         :param verbose_errs: whether full (True; default) or truncated (False) errors are raised
         :param dump_dir: directory to write buffer contents when exiting context due to raised
-          exception; pass None to not write to file (default)
+          exception or when flushing on exit fails due to an open circuit breaker; pass None to not
+          write to file (default)
+        :param columnar: whether pandas input is buffered as DataFrame chunks (True) rather than as
+          individual documents (False; default); documents are then generated from the chunks only
+          when needed (e.g., while flushing), which uses considerably less memory
+        :param linger: maximum number of seconds the oldest document can wait in the buffer before
+          the buffer is flushed when adding documents; pass None to only flush when full (default)
+        :param throttle: optional elasticbatch.throttle.Throttle limiting the rate at which
+          documents are flushed; can be shared by multiple buffers to limit their combined rate
+        :param circuit_breaker: optional elasticbatch.breaker.CircuitBreaker used to immediately
+          fail flushes (raising ElasticBufferCircuitOpenError) while Elasticsearch is unavailable
+        :param op_type: default bulk operation type of added documents, one of index (default),
+          create, update, upsert, delete; can be overridden when adding documents
+        :param stages: optional sequence of pipeline stages (see elasticbatch.pipeline) applied in
+          order to batches of documents when flushing; each stage must accept a list of documents
+          and return a list of documents without modifying the documents it accepts
+        :param null_values: handling of null values (NaN, NaT, None) in DataFrames: drop (default)
+          to omit the field from the document, null to set the field to None, or keep
+        :param datetime_format: conversion of datetime columns of DataFrames: iso (default) for
+          ISO 8601 strings, epoch_millis for milliseconds since epoch, or keep
+        :param tracer: optional elasticbatch.tracing.Tracer recording the duration of each phase of
+          adding and flushing documents; pass None to disable tracing (default)
+        :param targets: optional sequence of elasticbatch.targets.Target clusters to which
+          documents are also written (mirror targets) or written instead while the circuit breaker
+          is open (failover targets); documents are then serialized only once per flush
+        :param lanes: optional dict of priority lanes, keyed by name, each a dict of kwargs (size,
+          linger, bulk_kwargs) configuring a separate buffer to which documents added with that
+          priority are added; lanes share the client, throttle, circuit breaker and all other
+          configuration of the buffer, and bulk_kwargs of a lane update those of the buffer
+        :param id_strategy: optional elasticbatch.ids.IdStrategy generating a deterministic _id for
+          each added document that does not have one, making retried and replayed inserts
+          idempotent; ids are generated before applying metadata functions, so an _id metadata
+          function takes precedence. Pass None to not generate ids (default).
+        :param on_commit: optional function called after a successful flush with a dict of the
+          highest source position (passed as source_position when adding documents) of each
+          partition up to which all documents have been flushed, for partitions whose position
+          advanced; exceptions raised by on_commit are raised by the flush (after clearing the
+          flushed documents) and its positions are passed to on_commit again on the next flush.
+          Pass None to not track source positions (default).
         :param metadata_funcs: optional functions for generating Elasticsearch metadata fields
           (e.g., _index, _id) that will be appended to the top level of every document. Each
           function must accept one argument (the document as a dict) and return one value.
@@ -36,26 +117,57 @@ class ElasticBuffer:
           name (key) and function return (value). For the case of DataFrame input, the functions
           are applied to the documents generated from the DataFrame. It is generally more efficient
           to add documents already containing these metadata fields rather than generating metadata
-          via these functions.
+          via these functions. Results of functions decorated with elasticbatch.metadata.depends_on
+          are cached by the values of the fields on which they depend.
         """
 
         self.size = size
         self.verbose_errs = verbose_errs
         self.dump_dir = dump_dir
+        self.columnar = columnar
+        self.linger = linger
+        self.throttle = throttle
+        self.circuit_breaker = circuit_breaker
+        self.op_type = ops.validate_op_type(op_type)
+        self.stages = list(stages) if stages is not None else []
+        self.null_values = frames.validate_null_values(null_values)
+        self.datetime_format = frames.validate_datetime_format(datetime_format)
+        self.tracer = tracer
+        self.targets = list(targets) if targets is not None else []
+        self.id_strategy = id_strategy
+        self.on_commit = on_commit
         self.metadata_funcs = metadata_funcs
 
         self.bulk_kwargs = self._construct_bulk_kwargs(size, bulk_kwargs)
 
-        self._client = Elasticsearch(**client_kwargs) if client_kwargs else Elasticsearch()
+        self._client = self._create_client(client_kwargs)
 
         self._buffer = []                  # type: List[Dict]
+        self._frames = []                  # type: List[Tuple[Any, str]]
+        self._n_frame_docs = 0
+        self._has_partial_updates = False
+        self._n_filtered = 0
         self._oldest_doc_timestamp = None  # type: Optional[float]
+        self._insert_timestamps = array('d')
+        self._insert_counts = array('L')
+        self._last_flush_latency = {}      # type: Dict[float, float]
+        self._index_tuner = None           # type: Optional[IndexSettingsTuner]
+        self._lane_name = None             # type: Optional[str]
+        self._offsets = OffsetTracker()
+        self._positions = []               # type: List[SourcePosition]
+        # committable positions not yet successfully passed to on_commit (shared with lanes)
+        self._undelivered = {}             # type: Dict[Hashable, Any]
+
+        self.lanes = {
+            name: self._create_lane(name, **lane_kwargs)
+            for name, lane_kwargs in (lanes or {}).items()
+        }  # type: Dict[str, ElasticBuffer]
 
     def __str__(self):
         return f'{self.__class__.__name__} containing {len(self)} documents'
 
     def __len__(self):
-        return len(self._buffer)
+        return len(self._buffer) + self._n_frame_docs
 
     def __enter__(self):
         return self
@@ -64,11 +176,18 @@ class ElasticBuffer:
         err_raised = any((exc_type, exc_val, exc_tb))
         # only flush if exiting without raised Exception
         if not err_raised:
-            self.flush()
+            try:
+                self.flush()
+            except ElasticBufferCircuitOpenError:
+                # write contents of buffer to file rather than losing them while Elasticsearch is
+                # unavailable
+                self._dump()
+                raise
+            for target in self.targets:
+                target.wait()
             return
         # write contents of buffer to file on Exception
-        if self.dump_dir:
-            self._to_file()
+        self._dump()
 
     @property
     def oldest_elapsed_time(self) -> float:
@@ -78,21 +197,239 @@ class ElasticBuffer:
         now = time.time()
         return self._get_oldest_elapsed_time_from(now)
 
+    @property
+    def elapsed_time_percentiles(self) -> Dict[float, float]:
+        """
+        Get percentiles (keyed by latency_percentiles) of elapsed time in seconds between now and
+        insert time of each document in buffer
+        """
+        now = time.time()
+        return self._get_elapsed_time_percentiles_from(now)
+
+    @property
+    def last_flush_latency(self) -> Dict[float, float]:
+        """
+        Get percentiles (keyed by latency_percentiles) of time in seconds that documents waited in
+        the buffer before being inserted by the most recent successful flush
+        """
+        return dict(self._last_flush_latency)
+
+    @property
+    def committed_positions(self) -> Dict[Hashable, Any]:
+        """
+        Get the highest source position of each partition up to which all documents added with a
+        source_position (to the buffer or any of its lanes) have been flushed
+        """
+        return dict(self._offsets.committed)
+
+    @property
+    def metadata_cache_info(self) -> Dict[str, Any]:
+        """
+        Get cache statistics (hits, misses, maxsize, currsize) of each metadata function with
+        cached results (see elasticbatch.metadata.depends_on), keyed by field name
+        """
+        return {
+            field: func.cache_info()
+            for field, func in self.metadata_funcs.items()
+            if isinstance(func, CachedMetadataFunc)
+        }
+
+    @contextmanager
+    def bulk_load(
+        self,
+        refresh_interval: str = '-1',
+        number_of_replicas: int = 0,
+        refresh: bool = True,
+        force_merge: bool = False,
+    ) -> Iterator['ElasticBuffer']:
+        """
+        Context manager (wrapping the buffer's own context manager) for loading large amounts of
+        data: before documents are flushed to an index for the first time, the index's settings are
+        changed to favor indexing throughput, and the original settings of all such indices are
+        restored on exit, even when exiting due to a raised exception
+        :param refresh_interval: refresh interval of indices during the load; '-1' disables
+          refreshes
+        :param number_of_replicas: number of replicas of indices during the load
+        :param refresh: whether to refresh indices after restoring their settings
+        :param force_merge: whether to force merge indices to a single segment after restoring
+          their settings
+        """
+        tuner = IndexSettingsTuner(self._client, {
+            'index.refresh_interval': refresh_interval,
+            'index.number_of_replicas': number_of_replicas,
+        })
+        self._set_index_tuner(tuner)
+        try:
+            with self:
+                yield self
+        except BaseException:
+            self._set_index_tuner(None)
+            try:
+                tuner.restore(refresh=refresh, force_merge=force_merge)
+            except ElasticBatchError:
+                pass  # do not mask the original exception
+            raise
+        self._set_index_tuner(None)
+        tuner.restore(refresh=refresh, force_merge=force_merge)
+
     def flush(self) -> None:
         """
-        Bulk insert buffer contents to Elasticsearch
+        Bulk insert buffer contents (including the contents of all lanes) to Elasticsearch
         """
+        for lane in self.lanes.values():
+            lane.flush()
         if len(self) == 0:
+            self._commit_positions()  # positions of adds without documents
+            return
+        with self._span('flush', n_docs=len(self)):
+            self._flush()
+
+    def add(
+        self,
+        docs: 'DocumentBundle',
+        timestamp: Optional[float] = None,
+        op_type: Optional[str] = None,
+        priority: Optional[str] = None,
+        source_position: Optional[Tuple[Hashable, Any]] = None,
+    ) -> None:
+        """
+        Add documents from an DocumentBundle data structure to buffer
+        :param docs: DocumentBundle of documents to append
+        :param timestamp: seconds from epoch to associate as insert time for docs; defaults to now
+        :param op_type: bulk operation type of docs, one of index, create, update, upsert, delete;
+          defaults to the buffer's op_type. For delete, the values of a pandas Series are used as
+          the _id of the documents to delete.
+        :param priority: name of the lane to which to add docs; defaults to the buffer itself
+        :param source_position: optional tuple of (partition, offset) identifying the position in
+          a source (e.g., a Kafka topic partition and offset) from which docs were read, reported
+          to on_commit once docs and all documents added earlier from the same partition have been
+          flushed; positions of each partition must be added in order
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if source_position is not None:
+            if not isinstance(source_position, tuple) or len(source_position) != 2:
+                raise ValueError('source_position must be a tuple of (partition, offset)')
+
+        buffer = self
+        if priority is not None:
+            try:
+                buffer = self.lanes[priority]
+            except KeyError:
+                raise ValueError(f'priority must be one of {list(self.lanes)}')
+        buffer._add_bundle(docs, timestamp, op_type, source_position)
+        if len(buffer) == 0:
+            buffer._commit_positions()  # positions of adds without documents
+        if self.lanes:
+            self._flush_lingering_lanes(timestamp)
+
+    def show(self) -> None:
+        """
+        Print each (json-serialized) document in the buffer on a new line
+        """
+        for doc in self._documents():
+            print(json.dumps(doc))
+
+    def _add_bundle(
+        self,
+        docs: 'DocumentBundle',
+        timestamp: float,
+        op_type: Optional[str] = None,
+        source_position: Optional[Tuple[Hashable, Any]] = None,
+    ) -> None:
+        """
+        Add documents from an DocumentBundle data structure to buffer, without routing to lanes
+        :param docs: DocumentBundle of documents to append
+        :param timestamp: seconds from epoch to associate as insert time for docs
+        :param op_type: bulk operation type of docs; defaults to the buffer's op_type
+        :param source_position: optional tuple of (partition, offset) of docs in their source
+        """
+        op_type = self.op_type if op_type is None else ops.validate_op_type(op_type)
+        if op_type == ops.DELETE and hasattr(docs, 'to_frame'):
+            docs = docs.rename('_id')  # type: ignore  # docs is a pandas Series
+        if ops.is_partial_update(op_type):
+            self._has_partial_updates = True
+
+        is_frame = not isinstance(docs, (list, dict))
+        # whether docs is a new DataFrame (returned by DataFrame.assign) sharing no data with the
+        # caller's DataFrame or Series
+        is_copy = False
+        if is_frame and self.id_strategy is not None:
+            frame = self._to_frame(docs)
+            with self._span('generate_ids', n_docs=len(frame)):
+                docs = self.id_strategy.assign_frame(
+                    frame, self.null_values, self.datetime_format)
+            is_copy = docs is not frame
+
+        if self.columnar and is_frame:
+            frame = self._to_frame(docs)
+            with self._span('metadata_funcs', n_docs=len(frame)):
+                docs = self._apply_frame_metadata_funcs(frame)
+            is_copy = is_copy or docs is not frame
+            self._add_frame(docs, timestamp, op_type, source_position, copy=not is_copy)
             return
+        with self._span('convert_documents'):
+            docs_list = self._ensure_list(docs, self.null_values, self.datetime_format)
+        if not is_frame and self.id_strategy is not None:
+            with self._span('generate_ids', n_docs=len(docs_list)):
+                docs_list = self.id_strategy.assign(docs_list)
+        with self._span('metadata_funcs', n_docs=len(docs_list)):
+            docs_list = self._apply_metadata_funcs(docs_list)
+        docs_list = ops.set_op_type(docs_list, op_type)
+        self._add(docs_list, timestamp, source_position)
+
+    def _flush(self) -> None:
+        """
+        Bulk insert (nonempty) buffer contents to Elasticsearch
+        """
+        from elasticsearch import ElasticsearchException
 
+        failover = None  # type: Optional[Target]
+        probing = False
         try:
-            n_success, bulk_errs = bulk(self._client, self._buffer, **self.bulk_kwargs)
-        except ElasticsearchException as err:
-            raise ElasticBufferFlushError(
-                msg='Error while bulk inserting buffer contents',
-                err=err,
-                verbose=self.verbose_errs,
-            )
+            probing = self._check_circuit_breaker()
+        except ElasticBufferCircuitOpenError:
+            failover = self._failover_target()
+            if failover is None:
+                raise
+
+        required = []  # type: List[Tuple[Target, Any]]
+        try:
+            if self._index_tuner is not None and failover is None:
+                try:
+                    with self._span('tune_indices'):
+                        self._index_tuner.tune(self._target_indices())
+                except ElasticsearchException as err:
+                    probing = False
+                    self._record_flush_result(err)
+                    raise ElasticBufferFlushError(
+                        msg='Error while tuning index settings',
+                        err=err,
+                        verbose=self.verbose_errs,
+                    )
+
+            self._n_filtered = 0
+            try:
+                if self.targets:
+                    n_success, bulk_errs, required = self._bulk_to_targets(failover)
+                else:
+                    n_success, bulk_errs = self._bulk_to_primary()
+            except ElasticsearchException as err:
+                if failover is None:
+                    probing = False
+                    self._record_flush_result(err)
+                raise ElasticBufferFlushError(
+                    msg='Error while bulk inserting buffer contents',
+                    err=err,
+                    verbose=self.verbose_errs,
+                )
+            if failover is None:
+                probing = False
+                self._record_flush_result(None)
+        finally:
+            # release a probe claimed by this flush if its result was not recorded due to an
+            # unrelated error (e.g., raised by a pipeline stage) so the breaker can probe again
+            if probing:
+                self.circuit_breaker.release_probe()  # type: ignore  # probing requires breaker
 
         if len(bulk_errs) != 0:
             raise ElasticBufferFlushError(
@@ -100,52 +437,255 @@ class ElasticBuffer:
                 err=bulk_errs,
                 verbose=self.verbose_errs,
             )
-        if n_success != len(self):
-            n_fail = len(self) - n_success
+        n_docs = len(self) - self._n_filtered
+        if n_success != n_docs:
+            n_fail = n_docs - n_success
             raise ElasticBufferFlushError(
-                msg=f'Failed to insert {n_fail} of {len(self)} documents',
+                msg=f'Failed to insert {n_fail} of {n_docs} documents',
                 verbose=self.verbose_errs,
             )
+        self._wait_for_required(required, n_docs)
 
-        # clear buffer on successful bulk insert
+        # record queue latency and clear buffer on successful bulk insert
+        self._last_flush_latency = self._get_elapsed_time_percentiles_from(time.time())
         self._clear_buffer()
+        self._commit_positions()
 
-    def add(self, docs: DocumentBundle, timestamp: Optional[float] = None) -> None:
+    def _bulk_to_primary(self) -> Tuple[int, List[Dict]]:
         """
-        Add documents from an DocumentBundle data structure to buffer
-        :param docs: DocumentBundle of documents to append
-        :param timestamp: seconds from epoch to associate as insert time for docs; defaults to now
+        Bulk insert buffer contents with elasticsearch.helpers.bulk; returns the number of
+        successfully inserted documents and the errors of failed documents
         """
-        docs_list = self._ensure_list(docs)
-        docs_list = self._apply_metadata_funcs(docs_list)
-        timestamp = time.time() if timestamp is None else timestamp
-        self._add(docs_list, timestamp)
+        client = self._client if self.tracer is None else TracedClient(self._client, self.tracer)
+        docs = self._actions()
+        if self.throttle is not None:
+            docs = self._throttled(docs, self.throttle)
+        with self._span('bulk'):
+            return bulk(client, docs, **self.bulk_kwargs)
+
+    def _bulk_to_targets(
+        self,
+        failover: Optional[Target],
+    ) -> Tuple[int, List[Dict], List[Tuple[Target, Any]]]:
+        """
+        Serialize buffer contents once, one chunk at a time, queueing each chunk to all mirror
+        targets and sending it to the primary cluster (or the failover target) no faster than
+        allowed by the throttle (if any); returns the number of documents successfully inserted
+        into the primary cluster (or the failover target), the errors of failed documents, and the
+        futures of the requests to required mirror targets
+        :param failover: failover target to write to instead of the primary cluster, if any
+        """
+        client = self._client if self.tracer is None else TracedClient(self._client, self.tracer)
+        mirrors = [target for target in self.targets if target.role == Target.MIRROR]
+        chunks = encode_chunks(
+            self._actions(),
+            self._client.transport.serializer,
+            max(self.bulk_kwargs.get('chunk_size', self.size), 1),
+            self.bulk_kwargs.get('max_chunk_bytes', 100 * 1024 * 1024),
+        )
 
-    def show(self) -> None:
+        n_success = 0
+        bulk_errs = []  # type: List[Dict]
+        required = []   # type: List[Tuple[Target, Any]]
+        with self._span('bulk', target=None if failover is None else failover.name):
+            for chunk, n_bytes in chunks:
+                if self.throttle is not None:
+                    self.throttle.acquire(len(chunk), n_bytes if self.throttle.limits_bytes else 0)
+                for target in mirrors:
+                    future = target.submit(chunk, self.bulk_kwargs, self.tracer)
+                    if target.required:
+                        required.append((target, future))
+                if failover is not None:
+                    n_chunk_success, chunk_errs = failover.send(
+                        [chunk], self.bulk_kwargs, self.tracer)
+                else:
+                    n_chunk_success, chunk_errs = send_chunks(client, [chunk], self.bulk_kwargs)
+                n_success += n_chunk_success
+                bulk_errs.extend(chunk_errs)
+        return n_success, bulk_errs, required
+
+    def _failover_target(self) -> Optional[Target]:
         """
-        Print each (json-serialized) document in the buffer on a new line
+        Return the first available failover target, or None if there is none
         """
-        for doc in self._buffer:
-            print(json.dumps(doc))
+        for target in self.targets:
+            if target.role == Target.FAILOVER and target.available:
+                return target
+        return None
 
-    def _add(self, docs: List[Dict], timestamp: float) -> None:
+    def _wait_for_required(self, required: List[Tuple[Target, Any]], n_docs: int) -> None:
+        """
+        Wait for the requests to required mirror targets, raising ElasticBufferFlushError if any
+        of them failed
+        :param required: required mirror targets and the futures of their requests
+        :param n_docs: number of documents that each target should have inserted
+        """
+        n_successes = {}  # type: Dict[str, int]
+        for target, future in required:
+            try:
+                n_success, _ = future.result()
+            except Exception as err:
+                raise ElasticBufferFlushError(
+                    msg=f'Error while bulk inserting buffer contents to target {target.name}',
+                    err=err,
+                    verbose=self.verbose_errs,
+                )
+            n_successes[target.name] = n_successes.get(target.name, 0) + n_success
+        for name, n_success in n_successes.items():
+            if n_success != n_docs:
+                raise ElasticBufferFlushError(
+                    msg=f'Failed to insert {n_docs - n_success} of {n_docs} documents to '
+                        f'target {name}',
+                    verbose=self.verbose_errs,
+                )
+
+    def _add(
+        self,
+        docs: List[Dict],
+        timestamp: float,
+        source_position: Optional[Tuple[Hashable, Any]] = None,
+    ) -> None:
         """
         Add list of documents to buffer
         :param docs: documents to append
         :param timestamp: seconds from epoch to associate as insert time for docs
+        :param source_position: optional tuple of (partition, offset) of docs in their source
         """
+        self._register_position(source_position)
         if not docs:
             return
 
+        self._record_insert(len(docs), timestamp)
+        self._buffer.extend(docs)
+        self._flush_if_ready(timestamp)
+
+    def _add_frame(
+        self,
+        frame: Any,
+        timestamp: float,
+        op_type: str = ops.INDEX,
+        source_position: Optional[Tuple[Hashable, Any]] = None,
+        copy: bool = True,
+    ) -> None:
+        """
+        Add DataFrame to buffer as a single chunk without generating its documents
+        :param frame: pandas DataFrame to append
+        :param timestamp: seconds from epoch to associate as insert time for docs
+        :param op_type: bulk operation type of the documents generated from frame
+        :param source_position: optional tuple of (partition, offset) of frame in its source
+        :param copy: whether to buffer a copy of frame, so that later changes to a DataFrame
+          (or Series) of the caller sharing data with frame do not affect the buffered documents;
+          pass False when frame is already a copy
+        """
+        self._register_position(source_position)
+        if len(frame) == 0:
+            return
+
+        self._record_insert(len(frame), timestamp)
+        # a deep copy unless pandas copy-on-write (the default as of pandas 3.0) is enabled
+        self._frames.append((frame.copy() if copy else frame, op_type))
+        self._n_frame_docs += len(frame)
+        self._flush_if_ready(timestamp)
+
+    def _record_insert(self, n_docs: int, timestamp: float) -> None:
+        """
+        Record insert time of a batch of documents about to be added to the buffer
+        :param n_docs: number of documents in the batch
+        :param timestamp: seconds from epoch to associate as insert time for docs
+        """
         # record timestamp of insert time if buffer is empty
         if len(self) == 0:
             self._oldest_doc_timestamp = timestamp
+        self._insert_timestamps.append(timestamp)
+        self._insert_counts.append(n_docs)
 
-        self._buffer.extend(docs)
+    def _register_position(self, source_position: Optional[Tuple[Hashable, Any]]) -> None:
+        """
+        Register source position of documents about to be added to the buffer as pending until
+        the buffer is successfully flushed
+        :param source_position: optional tuple of (partition, offset) of the documents
+        """
+        if source_position is not None:
+            self._positions.append(self._offsets.register(*source_position))
 
-        # flush if buffer is full
+    def _commit_positions(self) -> None:
+        """
+        Mark source positions of flushed documents as done, calling on_commit with the partitions
+        whose committable position advanced. If on_commit raises an exception, its positions are
+        passed to on_commit again (along with any newly committable positions) the next time
+        positions are committed, e.g., on the next flush.
+        """
+        if not self._positions and not self._undelivered:
+            return
+        positions, self._positions = self._positions, []
+        committed = self._offsets.complete(positions)
+        if self.on_commit is None:
+            return
+        self._undelivered.update(committed)
+        if not self._undelivered:
+            return
+        self.on_commit(dict(self._undelivered))
+        self._undelivered.clear()
+
+    def _flush_if_ready(self, timestamp: float) -> None:
+        """
+        Flush buffer if it is full or if its oldest document has been waiting longer than linger
+        :param timestamp: timestamp in seconds (usually from epoch) of the most recent insert
+        """
         if len(self) > self.size:
             self.flush()
+            return
+        if self.linger is not None and self._get_oldest_elapsed_time_from(timestamp) >= self.linger:
+            self.flush()
+
+    def _flush_lingering_lanes(self, timestamp: float) -> None:
+        """
+        Flush each lane whose oldest document has been waiting longer than the lane's linger, so
+        that lanes are flushed in time while documents are added with other priorities
+        :param timestamp: timestamp in seconds (usually from epoch) of the most recent insert
+        """
+        for lane in self.lanes.values():
+            if lane.linger is None:
+                continue
+            if lane._get_oldest_elapsed_time_from(timestamp) >= lane.linger:
+                lane.flush()
+
+    def _create_lane(
+        self,
+        name: str,
+        size: Optional[int] = None,
+        linger: Optional[float] = None,
+        bulk_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> 'ElasticBuffer':
+        """
+        Create an empty buffer sharing the client and configuration of this buffer
+        :param name: name of the lane
+        :param size: number of documents the lane can hold before flushing; defaults to the size of
+          this buffer
+        :param linger: maximum number of seconds the oldest document can wait in the lane before
+          the lane is flushed when adding documents; pass None to only flush when full (default)
+        :param bulk_kwargs: dict of kwargs for elasticsearch.helpers.bulk updating the bulk_kwargs
+          of this buffer
+        """
+        lane = copy.copy(self)
+        lane.size = self.size if size is None else size
+        lane.linger = linger
+        lane.bulk_kwargs = {**self.bulk_kwargs, 'chunk_size': lane.size, **(bulk_kwargs or {})}
+        lane.lanes = {}
+        lane._lane_name = name
+        lane._clear_buffer()
+        lane._last_flush_latency = {}
+        lane._positions = []
+        return lane
+
+    def _set_index_tuner(self, tuner: Optional[IndexSettingsTuner]) -> None:
+        """
+        Set index settings tuner of the buffer and all of its lanes
+        :param tuner: tuner applied when flushing or None to not tune indices
+        """
+        self._index_tuner = tuner
+        for lane in self.lanes.values():
+            lane._index_tuner = tuner
 
     def _apply_metadata_funcs(self, docs: List[Dict]) -> List[Dict]:
         """
@@ -158,12 +698,131 @@ class ElasticBuffer:
             doc.update({field: func(doc) for field, func in self.metadata_funcs.items()})
         return docs
 
+    def _apply_frame_metadata_funcs(self, frame: Any) -> Any:
+        """
+        Return DataFrame with a column containing the result of each metadata function applied to
+        the documents generated from its rows. Functions with cached results are applied to
+        documents containing only the fields on which they depend; documents of all fields are
+        generated (one bulk chunk at a time) only for other functions.
+        :param frame: pandas DataFrame on which to apply metadata functions
+        """
+        if not self.metadata_funcs or len(frame) == 0:
+            return frame
+
+        results = {field: [] for field in self.metadata_funcs}  # type: Dict[str, List[Any]]
+        chunk_size = max(self.bulk_kwargs.get('chunk_size', self.size), 1)
+        for start in range(0, len(frame), chunk_size):
+            chunk = frame.iloc[start:start + chunk_size]
+            docs = None
+            for field, func in self.metadata_funcs.items():
+                if isinstance(func, CachedMetadataFunc) and set(func.fields) <= set(chunk.columns):
+                    func_docs = frames.frame_to_records(
+                        chunk[list(func.fields)], self.null_values, self.datetime_format)
+                else:
+                    if docs is None:
+                        docs = frames.frame_to_records(
+                            chunk, self.null_values, self.datetime_format)
+                    func_docs = docs
+                results[field].extend(func(doc) for doc in func_docs)
+        return frame.assign(**results)
+
     def _clear_buffer(self) -> None:
         """
         Clear buffer contents and associated state
         """
         self._buffer = []
+        self._frames = []
+        self._n_frame_docs = 0
+        self._has_partial_updates = False
         self._oldest_doc_timestamp = None
+        self._insert_timestamps = array('d')
+        self._insert_counts = array('L')
+
+    def _documents(self) -> Iterable[Dict]:
+        """
+        Return iterable over all documents in the buffer, lazily generating documents from any
+        buffered DataFrame chunks
+        """
+        if not self._frames:
+            return self._buffer
+        return itertools.chain(
+            self._buffer,
+            *(self._frame_documents(frame, op_type) for frame, op_type in self._frames),
+        )
+
+    def _frame_documents(self, frame: Any, op_type: str) -> Iterator[Dict]:
+        """
+        Generate documents from a DataFrame chunk, materializing at most one bulk chunk at a time
+        :param frame: pandas DataFrame from which to generate documents
+        :param op_type: bulk operation type of the generated documents
+        """
+        chunk_size = max(self.bulk_kwargs.get('chunk_size', self.size), 1)
+        for start in range(0, len(frame), chunk_size):
+            docs = frames.frame_to_records(
+                frame.iloc[start:start + chunk_size],
+                self.null_values,
+                self.datetime_format,
+            )
+            yield from ops.set_op_type(docs, op_type)
+
+    def _target_indices(self) -> Set[str]:
+        """
+        Return names of indices to which the documents in the buffer will be inserted
+        """
+        indices = set()
+        default_index = self.bulk_kwargs.get('index')
+        for frame, _ in self._frames:
+            # metadata functions have already been applied, so any _index is a column
+            if '_index' not in frame.columns:
+                indices.add(default_index)
+                continue
+            indices.update(frame['_index'].dropna().unique())
+            if frame['_index'].isna().any():
+                indices.add(default_index)
+        for doc in self._buffer:
+            indices.add(doc.get('_index', default_index))
+        indices.discard(None)
+        return indices
+
+    def _pipelined(self, docs: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Generate documents resulting from applying the pipeline to batches of documents, recording
+        the number of documents removed by the pipeline
+        :param docs: documents to which to apply the pipeline
+        """
+        chunk_size = max(self.bulk_kwargs.get('chunk_size', self.size), 1)
+        docs = iter(docs)
+        while True:
+            batch = list(itertools.islice(docs, chunk_size))
+            if not batch:
+                return
+            with self._span('pipeline', n_docs=len(batch)):
+                result = run_pipeline(self.stages, batch)
+            self._n_filtered += len(batch) - len(result)
+            yield from result
+
+    def _actions(self, apply_pipeline: bool = True) -> Iterable[Dict]:
+        """
+        Return iterable over bulk actions for all documents in the buffer
+        :param apply_pipeline: whether to apply the pipeline to the documents
+        """
+        docs = self._documents()
+        if apply_pipeline and self.stages:
+            docs = self._pipelined(docs)
+        if not self._has_partial_updates:
+            return docs
+        return map(ops.to_action, docs)
+
+    def _dump(self) -> None:
+        """
+        Write contents of buffer and of all nonempty lanes as ndjson files if dump_dir is set
+        """
+        if not self.dump_dir:
+            return
+        self._to_file()
+        for lane in self.lanes.values():
+            if len(lane) != 0:
+                lane._to_file()
 
     def _to_file(self, timestamp: Optional[float] = None):
         """
@@ -171,14 +830,84 @@ class ElasticBuffer:
         :param timestamp: timestamp to associate with dumped file; defaults to now
         """
         timestamp = time.time() if timestamp is None else timestamp
+        lane = '' if self._lane_name is None else f'{self._lane_name}_'
         dump_file = os.path.join(
             self.dump_dir,  # type: ignore  # function not called when None
-            f'{self.__class__.__name__}_buffer_dump_{timestamp}'
+            f'{self.__class__.__name__}_buffer_dump_{lane}{timestamp}'
         )
+        # the pipeline is not applied, as stages can fail (e.g., while exiting due to an exception
+        # raised by a stage) or call external services
         with open(dump_file, 'w') as handle:
-            for doc in self._buffer:
+            for doc in self._actions(apply_pipeline=False):
                 handle.write(json.dumps(doc) + '\n')
 
+    def _span(self, name: str, **attributes: Any) -> ContextManager[Optional[Dict[str, Any]]]:
+        """
+        Return context manager recording a span with the tracer, or a no-op context manager when
+        tracing is disabled
+        :param name: name of the span
+        :param attributes: attributes of the span
+        """
+        if self.tracer is None:
+            return _NO_SPAN
+        return self.tracer.span(name, **attributes)
+
+    def _check_circuit_breaker(self) -> bool:
+        """
+        Raise ElasticBufferCircuitOpenError if the circuit breaker does not allow flushing, probing
+        Elasticsearch first when the breaker is half-open; returns whether the flush claimed the
+        breaker's probe, in which case its result must be recorded or the probe released
+        """
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return False
+
+        if not breaker.allow_request():
+            raise ElasticBufferCircuitOpenError(
+                msg='Circuit breaker is open, not attempting to bulk insert buffer contents',
+                verbose=self.verbose_errs,
+            )
+        if breaker.state != breaker.HALF_OPEN:
+            return False
+
+        try:
+            available = self._client.ping(request_timeout=breaker.probe_timeout)
+        except BaseException:
+            breaker.release_probe()
+            raise
+        if not available:
+            breaker.record_failure()
+            raise ElasticBufferCircuitOpenError(
+                msg='Elasticsearch unavailable during circuit breaker probe',
+                verbose=self.verbose_errs,
+            )
+        return True
+
+    def _record_flush_result(self, err: Optional[Exception]) -> None:
+        """
+        Record result of a bulk insert request with the circuit breaker; only errors indicating
+        that Elasticsearch is unavailable count as failures
+        :param err: exception raised by the request or None if no exception was raised
+        """
+        if self.circuit_breaker is None:
+            return
+        if err is not None and self._is_unavailable_err(err):
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+    def _throttled(self, docs: Iterable[Dict], throttle: Throttle) -> Iterator[Dict]:
+        """
+        Generate documents no faster than allowed by a throttle
+        :param docs: documents to throttle
+        :param throttle: throttle limiting the rate at which documents are generated
+        """
+        serializer = self._client.transport.serializer
+        for doc in docs:
+            n_bytes = len(serializer.dumps(doc).encode()) if throttle.limits_bytes else 0
+            throttle.acquire(1, n_bytes)
+            yield doc
+
     def _get_oldest_elapsed_time_from(self, timestamp: float) -> float:
         """
         Return elapsed seconds between timestamp and insert time of oldest document in the buffer
@@ -191,15 +920,45 @@ class ElasticBuffer:
         except TypeError:
             raise TypeError('Cannot use non-float as numeric value for computing elapsed time')
 
+    def _get_elapsed_time_percentiles_from(self, timestamp: float) -> Dict[float, float]:
+        """
+        Return percentiles of elapsed seconds between timestamp and insert time of each document in
+        the buffer; empty if the buffer has no recorded insert times
+        :param timestamp: timestamp in seconds (usually from epoch)
+        """
+        elapsed = [timestamp - insert_time for insert_time in self._insert_timestamps]
+        return weighted_percentiles(elapsed, self._insert_counts, self.latency_percentiles)
+
     @staticmethod
-    def _ensure_list(docs: DocumentBundle) -> List[Dict]:
+    def _ensure_list(
+        docs: 'DocumentBundle',
+        null_values: str = 'drop',
+        datetime_format: str = 'iso',
+    ) -> List[Dict]:
+        """
+        Return list of documents from a DocumentBundle, sanitizing the values of DataFrames
+        :param docs: DocumentBundle of documents
+        :param null_values: handling of null values in DataFrames (see frames.frame_to_records)
+        :param datetime_format: conversion of datetime columns of DataFrames (see
+          frames.frame_to_records)
+        """
         if isinstance(docs, list):
             return docs
         if isinstance(docs, dict):
             return [docs]
+
+        from elasticbatch.types import no_pandas
         if no_pandas:
             raise ValueError('Must pass one of [List, Dict]')
+        frame = ElasticBuffer._to_frame(docs)
+        return frames.frame_to_records(frame, null_values, datetime_format)
 
+    @staticmethod
+    def _to_frame(docs: Any) -> Any:
+        """
+        Return pandas DataFrame from pandas Series or DataFrame, adding a named index as a column
+        :param docs: pandas Series or DataFrame
+        """
         # docs is a pandas Series
         try:
             docs = docs.to_frame()
@@ -210,11 +969,36 @@ class ElasticBuffer:
         try:
             if docs.index.name:
                 docs = docs.reset_index()
-            return docs.to_dict(orient='records')
+            return docs
         except AttributeError:
             pass
         raise ValueError('Must pass one of [List, Dict, pandas.Series, pandas.DataFrame]')
 
+    @staticmethod
+    def _create_client(client_kwargs: Optional[Dict[str, Any]]) -> Any:
+        """
+        Create Elasticsearch client, importing elasticsearch only when a buffer is created
+        :param client_kwargs: optional dict of kwargs for elasticsearch.Elasticsearch
+        """
+        from elasticsearch import Elasticsearch
+        return Elasticsearch(**client_kwargs) if client_kwargs else Elasticsearch()
+
+    @staticmethod
+    def _is_unavailable_err(err: Exception) -> bool:
+        """
+        Return whether an exception indicates that Elasticsearch is unavailable (connection errors
+        and server-side errors) rather than a problem with the request or the documents
+        :param err: exception raised by the Elasticsearch client
+        """
+        from elasticsearch import ConnectionError as ESConnectionError
+        from elasticsearch import TransportError
+
+        if isinstance(err, ESConnectionError):
+            return True
+        if isinstance(err, TransportError):
+            return isinstance(err.status_code, int) and err.status_code >= 500
+        return False
+
     @staticmethod
     def _construct_bulk_kwargs(size: int, bulk_kwargs: Optional[Dict]) -> Dict[str, Any]:
         """
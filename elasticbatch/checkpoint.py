@@ -0,0 +1,68 @@
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Iterable
+
+
+class SourcePosition:
+    """
+    Position (e.g., a Kafka offset) in a partition of a source from which documents were read,
+    marked done once the documents have been successfully flushed
+    """
+
+    __slots__ = ('partition', 'offset', 'done')
+
+    def __init__(self, partition: Hashable, offset: Any) -> None:
+        self.partition = partition
+        self.offset = offset
+        self.done = False
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.partition!r}, {self.offset!r}, done={self.done})'
+
+
+class OffsetTracker:
+    """
+    Tracker of the source positions of buffered documents, determining for each partition the
+    highest position up to which all positions (in the order they were registered) are done and
+    can therefore be committed to the source. Positions can be completed out of order (e.g., by
+    buffer lanes flushing independently) without committing past a position that is not done.
+    """
+
+    def __init__(self) -> None:
+        self.committed = {}  # type: Dict[Hashable, Any]
+        self._pending = {}   # type: Dict[Hashable, Deque[SourcePosition]]
+
+    def __len__(self):
+        return sum(len(positions) for positions in self._pending.values())
+
+    def register(self, partition: Hashable, offset: Any) -> SourcePosition:
+        """
+        Register a position as pending; positions of a partition must be registered in order
+        :param partition: partition of the source (e.g., a Kafka topic and partition)
+        :param offset: opaque position within the partition (e.g., a Kafka offset)
+        """
+        position = SourcePosition(partition, offset)
+        self._pending.setdefault(partition, deque()).append(position)
+        return position
+
+    def complete(self, positions: Iterable[SourcePosition]) -> Dict[Hashable, Any]:
+        """
+        Mark positions as done; returns the newly committable position of each partition whose
+        committable position advanced
+        :param positions: positions returned by register
+        """
+        partitions = set()
+        for position in positions:
+            position.done = True
+            partitions.add(position.partition)
+
+        advanced = {}
+        for partition in partitions:
+            pending = self._pending.get(partition)
+            if pending is None:
+                continue  # positions already completed
+            while pending and pending[0].done:
+                advanced[partition] = pending.popleft().offset
+            if not pending:
+                del self._pending[partition]
+        self.committed.update(advanced)
+        return advanced
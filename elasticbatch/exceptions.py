@@ -42,3 +42,10 @@ class ElasticBufferFlushError(ElasticBatchError):
         except AttributeError:
             err_name = self.err.__class__.__name__
         return f'{self.msg}: {err_name}: {self.err}'
+
+
+class ElasticBufferCircuitOpenError(ElasticBufferFlushError):
+    """
+    Exception raised by elasticbatch.ElasticBuffer when flushing is refused because its circuit
+    breaker is open, indicating Elasticsearch is currently unavailable
+    """
@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, Tuple
+
+# handling of null values (NaN, NaT, None, pandas.NA) in DataFrames
+NULL_VALUES = ('drop', 'null', 'keep')
+
+# handling of datetime columns in DataFrames
+DATETIME_FORMATS = ('iso', 'epoch_millis', 'keep')
+
+
+def validate_null_values(null_values: str) -> str:
+    if null_values not in NULL_VALUES:
+        raise ValueError(f'null_values must be one of {list(NULL_VALUES)}, got {null_values}')
+    return null_values
+
+
+def validate_datetime_format(datetime_format: str) -> str:
+    if datetime_format not in DATETIME_FORMATS:
+        raise ValueError(
+            f'datetime_format must be one of {list(DATETIME_FORMATS)}, got {datetime_format}'
+        )
+    return datetime_format
+
+
+def frame_to_records(
+    frame: Any,
+    null_values: str = 'drop',
+    datetime_format: str = 'iso',
+) -> List[Dict]:
+    """
+    Return list of documents (one per row) from a pandas DataFrame, sanitizing values column-wise
+    before generating the documents: numpy values are converted to native Python types, null
+    values are dropped or set to None, and datetimes are converted to ISO 8601 strings or epoch
+    milliseconds
+    :param frame: pandas DataFrame
+    :param null_values: drop (default) to omit fields with null values from documents, null to set
+      them to None, or keep to leave them unchanged
+    :param datetime_format: iso (default) for ISO 8601 strings (in UTC for timezone-aware columns),
+      epoch_millis for integer milliseconds since epoch, or keep to leave them unchanged
+    """
+    columns = list(frame.columns)
+    if not columns:
+        return [{} for _ in range(len(frame))]
+
+    values = []
+    dropped = []
+    for i, name in enumerate(columns):
+        col_values, null_rows = column_to_values(frame.iloc[:, i], null_values, datetime_format)
+        if null_values == 'drop' and len(null_rows):
+            dropped.append((name, null_rows))
+        values.append(col_values)
+
+    records = [dict(zip(columns, row)) for row in zip(*values)]
+    for name, null_rows in dropped:
+        for row in null_rows:
+            del records[row][name]
+    return records
+
+
+def column_to_values(
+    col: Any,
+    null_values: str = 'drop',
+    datetime_format: str = 'iso',
+) -> Tuple[List[Any], Any]:
+    """
+    Return list of sanitized values of a pandas Series (see frame_to_records), with null values set
+    to None unless null_values is keep, and the positions of the null values (empty if keep)
+    :param col: pandas Series
+    :param null_values: drop (default), null, or keep
+    :param datetime_format: iso (default), epoch_millis, or keep
+    """
+    col, null_rows = convert_column(col, null_values, datetime_format)
+    values = col.tolist()
+    for row in null_rows:
+        values[row] = None
+    return values, null_rows
+
+
+def convert_column(
+    col: Any,
+    null_values: str = 'drop',
+    datetime_format: str = 'iso',
+) -> Tuple[Any, Any]:
+    """
+    Return pandas Series with datetimes converted to the specified format (see frame_to_records)
+    and the positions of its null values (empty if null_values is keep), which are not changed
+    :param col: pandas Series
+    :param null_values: drop (default), null, or keep
+    :param datetime_format: iso (default), epoch_millis, or keep
+    """
+    mask = col.isna().to_numpy() if null_values != 'keep' else None
+    col = _convert_datetimes(col, datetime_format)
+    if mask is None or not mask.any():
+        return col, ()
+    return col, mask.nonzero()[0]
+
+
+def _convert_datetimes(col: Any, datetime_format: str) -> Any:
+    """
+    Return column with datetimes converted to the specified format; other columns are returned
+    unchanged
+    :param col: pandas Series
+    :param datetime_format: one of DATETIME_FORMATS
+    """
+    if datetime_format == 'keep':
+        return col
+
+    import pandas as pd
+
+    if not pd.api.types.is_datetime64_any_dtype(col.dtype):
+        return col
+
+    tz_aware = getattr(col.dt, 'tz', None) is not None
+    if tz_aware:
+        col = col.dt.tz_convert('UTC')
+    if datetime_format == 'iso':
+        return col.dt.strftime('%Y-%m-%dT%H:%M:%S.%f' + ('Z' if tz_aware else ''))
+    epoch = pd.Timestamp(0, tz='UTC' if tz_aware else None)
+    # nullable integer type keeps milliseconds as integers when the column contains NaT
+    return ((col - epoch) // pd.Timedelta(1, unit='ms')).astype('Int64')
@@ -0,0 +1,196 @@
+import hashlib
+import struct
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from elasticbatch import frames
+from elasticbatch.ops import METADATA_FIELDS
+
+# hash algorithms available for generating ids; xxh3 requires the xxhash package
+ALGORITHMS = ('blake2b', 'xxh3')
+
+ID_FIELD = '_id'
+
+# separator of the fields of a key
+SEPARATOR = '\x1f'
+
+_DOUBLE = struct.Struct('<d')
+_DOUBLE_BITS = struct.Struct('<Q')
+
+
+def _blake2b_hexdigest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _value_str(value: Any) -> str:
+    """
+    Return the string representing a value in a key: None is an empty string and floats are the
+    hex representation of their IEEE 754 bits, which (unlike their shortest decimal representation)
+    can be computed column-wise
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return hex(_DOUBLE_BITS.unpack(_DOUBLE.pack(value))[0])
+    return str(value)
+
+
+def _column_strs(
+    col: Any,
+    null_values: str = 'drop',
+    datetime_format: str = 'iso',
+) -> Tuple[List[str], Any]:
+    """
+    Return list of the strings representing the sanitized values (see
+    elasticbatch.frames.column_to_values) of a pandas Series in keys, computed column-wise for
+    numeric and string columns, and the positions of the null values (empty if null_values is keep)
+    :param col: pandas Series
+    :param null_values: handling of null values (see elasticbatch.frames.frame_to_records)
+    :param datetime_format: conversion of datetime columns (see
+      elasticbatch.frames.frame_to_records)
+    """
+    import numpy as np
+    import pandas as pd
+
+    col, null_rows = frames.convert_column(col, null_values, datetime_format)
+    kind = col.dtype.kind if isinstance(col.dtype, np.dtype) else None
+    if kind == 'f':
+        bits = col.to_numpy(dtype='float64').view('uint64')
+        strs = list(map(hex, bits.tolist()))
+    elif kind in ('b', 'i', 'u'):
+        strs = list(map(str, col.tolist()))
+    elif pd.api.types.infer_dtype(col, skipna=True) == 'string':
+        values = col.tolist()
+        strs = list(map(str, values))
+        # string columns can contain null values (e.g., NaN) that are kept when null_values is keep
+        for row in col.isna().to_numpy().nonzero()[0]:
+            strs[row] = _value_str(values[row])
+    else:
+        strs = list(map(_value_str, col.tolist()))
+    for row in null_rows:
+        strs[row] = ''
+    return strs, null_rows
+
+
+def _get_hasher(algorithm: str) -> Callable[[bytes], str]:
+    """
+    Return function computing the 128-bit hex digest of bytes with a hash algorithm
+    :param algorithm: one of ALGORITHMS
+    """
+    if algorithm == 'blake2b':
+        return _blake2b_hexdigest
+    if algorithm == 'xxh3':
+        try:
+            import xxhash
+        except ImportError:
+            raise ImportError('xxhash must be installed to generate ids with the xxh3 algorithm')
+        return xxhash.xxh3_128_hexdigest
+    raise ValueError(f'algorithm must be one of {list(ALGORITHMS)}, got {algorithm}')
+
+
+class IdStrategy:
+    """
+    Generator of deterministic document ids (_id) from the values of a document's fields, so that
+    inserting the same document more than once (e.g., when retrying a flush or replaying a dumped
+    buffer) overwrites rather than duplicates it. Ids are the 128-bit hex digest of a key formed
+    from the names and values of the key fields, or of all non-metadata fields when no key fields
+    are specified. For DataFrames, the keys of all rows are formed column-wise from the same
+    sanitized values (see elasticbatch.frames) as the documents generated from the rows, so that a
+    row is assigned the same id as the document generated from it while only joining and hashing
+    the key are done per row.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        algorithm: str = 'blake2b',
+    ) -> None:
+        """
+        :param fields: names of the fields identifying a document; pass None to use all fields
+          except metadata fields such as _index (default)
+        :param algorithm: hash algorithm, one of blake2b (default) or xxh3 (requires the xxhash
+          package and is faster for large documents)
+        """
+        self.fields = tuple(fields) if fields is not None else None
+        if self.fields is not None and not self.fields:
+            raise ValueError('Must specify at least one field or None for all fields')
+        self.algorithm = algorithm
+        self._hasher = _get_hasher(algorithm)
+
+    def __call__(self, doc: Dict) -> str:
+        """
+        Return the id of a document; missing key fields are treated as null values
+        :param doc: document from which to generate an id
+        """
+        fields = self.fields if self.fields is not None else self._content_fields(doc)
+        key = SEPARATOR.join(f'{field}={_value_str(doc.get(field))}' for field in fields)
+        return self._hasher(key.encode())
+
+    def assign(self, docs: List[Dict]) -> List[Dict]:
+        """
+        Return list of documents updated with a generated _id unless they already contain one
+        :param docs: documents to which to assign ids
+        """
+        for doc in docs:
+            if doc.get(ID_FIELD) is None:
+                doc[ID_FIELD] = self(doc)
+        return docs
+
+    def assign_frame(
+        self,
+        frame: Any,
+        null_values: str = 'drop',
+        datetime_format: str = 'iso',
+    ) -> Any:
+        """
+        Return copy of a pandas DataFrame with an _id column containing the generated id of each
+        row, keeping non-null values of an existing _id column; each id equals the id of the
+        document generated from the row with the same null_values and datetime_format
+        :param frame: pandas DataFrame to which to assign ids
+        :param null_values: handling of null values (see elasticbatch.frames.frame_to_records)
+        :param datetime_format: conversion of datetime columns (see
+          elasticbatch.frames.frame_to_records)
+        """
+        if len(frame) == 0:
+            return frame
+        has_ids = ID_FIELD in frame.columns
+        if has_ids and frame[ID_FIELD].notna().all():
+            return frame
+
+        fields = self.fields if self.fields is not None else self._content_fields(frame.columns)
+        # fields with null values are omitted from documents, and therefore from content keys
+        omit_nulls = self.fields is None and null_values == 'drop'
+        # each field contributes its prefix (separator and name) and value to the key of each row,
+        # so keys are formed by joining the parts of a row and removing the leading separator
+        parts = []  # type: List[Iterable[str]]
+        for field in fields:
+            if field not in frame.columns:
+                raise ValueError(f'Cannot generate ids of DataFrame missing key field {field}')
+            strs, null_rows = _column_strs(frame[field], null_values, datetime_format)
+            prefix = f'{SEPARATOR}{field}='
+            if omit_nulls and len(null_rows):
+                prefixes = [prefix] * len(frame)
+                for row in null_rows:
+                    prefixes[row] = ''
+                parts.append(prefixes)
+            else:
+                parts.append(repeat(prefix))
+            parts.append(strs)
+
+        hasher = self._hasher
+        if parts:
+            ids = [hasher(''.join(row)[1:].encode()) for row in zip(*parts)]
+        else:
+            ids = [hasher(b'')] * len(frame)
+        if has_ids:
+            existing = frame[ID_FIELD]
+            ids = existing.where(existing.notna(), ids)
+        return frame.assign(**{ID_FIELD: ids})
+
+    @staticmethod
+    def _content_fields(fields: Any) -> List[str]:
+        """
+        Return sorted names of non-metadata fields
+        :param fields: iterable of field names (e.g., a document or DataFrame columns)
+        """
+        return sorted(field for field in fields if field not in METADATA_FIELDS)
@@ -0,0 +1,80 @@
+from typing import Any, Dict, Iterable, List, Set
+
+from elasticbatch.exceptions import ElasticBatchError
+
+
+class IndexSettingsTuner:
+    """
+    Temporarily applies index settings (e.g., disabling refreshes and replicas) to Elasticsearch
+    indices for faster bulk loading and restores the original settings of the indices afterward
+    """
+
+    def __init__(self, client: Any, settings: Dict[str, Any]) -> None:
+        """
+        :param client: elasticsearch.Elasticsearch client
+        :param settings: dict of flat index settings (e.g., index.refresh_interval) to apply
+        """
+        self.settings = settings
+        self._client = client
+        self._tuned = set()     # type: Set[str]
+        self._original = {}     # type: Dict[str, Dict[str, Any]]
+
+    @property
+    def tuned_indices(self) -> List[str]:
+        """
+        Get names of (concrete) indices to which settings have been applied
+        """
+        return list(self._original)
+
+    def tune(self, indices: Iterable[str]) -> None:
+        """
+        Record original settings of indices and apply settings; indices that do not yet exist are
+        skipped and can be tuned once they have been created
+        :param indices: names, aliases, or patterns of indices to tune
+        """
+        from elasticsearch import NotFoundError
+
+        for index in set(indices) - self._tuned:
+            try:
+                resp = self._client.indices.get_settings(
+                    index=index,
+                    name=','.join(self.settings),
+                    flat_settings=True,
+                )
+            except NotFoundError:
+                continue
+            for concrete_index, body in resp.items():
+                if concrete_index in self._original:
+                    continue
+                current = body.get('settings', {})
+                self._client.indices.put_settings(index=concrete_index, body=self.settings)
+                # settings not explicitly set are restored to their defaults by setting to None
+                self._original[concrete_index] = {name: current.get(name) for name in self.settings}
+            self._tuned.add(index)
+
+    def restore(self, refresh: bool = True, force_merge: bool = False) -> None:
+        """
+        Restore original settings of all tuned indices, attempting every index before raising
+        ElasticBatchError if any index could not be restored
+        :param refresh: whether to refresh indices after restoring their settings
+        :param force_merge: whether to force merge indices to a single segment after restoring
+          their settings
+        """
+        from elasticsearch import ElasticsearchException
+
+        failed = {}
+        for index, original in self._original.items():
+            try:
+                self._client.indices.put_settings(index=index, body=original)
+                if refresh:
+                    self._client.indices.refresh(index=index)
+                if force_merge:
+                    self._client.indices.forcemerge(index=index, max_num_segments=1)
+            except ElasticsearchException as err:
+                failed[index] = err
+
+        # keep original settings of indices that failed to be restored so restoring can be retried
+        self._tuned = set()
+        self._original = {index: self._original[index] for index in failed}
+        if failed:
+            raise ElasticBatchError(f'Failed to restore settings of indices: {failed}')
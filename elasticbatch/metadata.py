@@ -0,0 +1,67 @@
+from functools import lru_cache, update_wrapper
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class CachedMetadataFunc:
+    """
+    Metadata function whose results are cached in a bounded LRU cache keyed by the values of the
+    fields on which it depends. The wrapped function is called with a dict containing only these
+    fields, so it must not depend on any other field of the document.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[Dict], Any],
+        fields: Iterable[str],
+        maxsize: Optional[int] = 1024,
+    ) -> None:
+        """
+        :param func: metadata function accepting a document (dict) and returning one value
+        :param fields: names of the fields on which func depends
+        :param maxsize: maximum number of cached results; pass None for an unbounded cache
+        """
+        self.fields = tuple(fields)
+        if not self.fields:
+            raise ValueError('Must specify at least one field')
+        self.func = func
+        self._cached = lru_cache(maxsize=maxsize)(self._call)
+        update_wrapper(self, func)
+
+    def __call__(self, doc: Dict) -> Any:
+        key = tuple(doc.get(field) for field in self.fields)
+        try:
+            hash(key)
+        except TypeError:
+            # unhashable field values cannot be cached
+            return self._call(key)
+        return self._cached(key)
+
+    def cache_info(self) -> Any:
+        """
+        Get hits, misses, maxsize and currsize of the cache
+        """
+        return self._cached.cache_info()
+
+    def cache_clear(self) -> None:
+        """
+        Clear the cache
+        """
+        self._cached.cache_clear()
+
+    def _call(self, key: tuple) -> Any:
+        return self.func(dict(zip(self.fields, key)))
+
+
+def depends_on(
+    *fields: str,
+    maxsize: Optional[int] = 1024,
+) -> Callable[[Callable[[Dict], Any]], CachedMetadataFunc]:
+    """
+    Decorator declaring the fields on which a metadata function depends so that its results are
+    cached by the values of these fields (see CachedMetadataFunc)
+    :param fields: names of the fields on which the decorated function depends
+    :param maxsize: maximum number of cached results; pass None for an unbounded cache
+    """
+    def decorator(func: Callable[[Dict], Any]) -> CachedMetadataFunc:
+        return CachedMetadataFunc(func, fields, maxsize=maxsize)
+    return decorator
@@ -0,0 +1,95 @@
+from typing import Dict, List
+
+# bulk operation types supported by elasticbatch.ElasticBuffer
+INDEX = 'index'
+CREATE = 'create'
+UPDATE = 'update'
+UPSERT = 'upsert'
+DELETE = 'delete'
+OP_TYPES = (INDEX, CREATE, UPDATE, UPSERT, DELETE)
+
+# field used by elasticsearch.helpers.bulk to specify the operation type of a document
+OP_TYPE_FIELD = '_op_type'
+
+# top-level fields treated as action metadata rather than document data by elasticsearch.helpers
+METADATA_FIELDS = frozenset({
+    OP_TYPE_FIELD,
+    '_id',
+    '_index',
+    '_if_seq_no',
+    '_if_primary_term',
+    '_parent',
+    '_percolate',
+    '_retry_on_conflict',
+    '_routing',
+    '_timestamp',
+    '_type',
+    '_version',
+    '_version_type',
+    'if_seq_no',
+    'if_primary_term',
+    'parent',
+    'pipeline',
+    'retry_on_conflict',
+    'routing',
+    'version',
+    'version_type',
+})
+
+# top-level fields of an update action specifying its body
+UPDATE_BODY_FIELDS = frozenset({'doc', 'script', '_source'})
+
+
+def validate_op_type(op_type: str) -> str:
+    """
+    Return operation type if supported, otherwise raise ValueError
+    :param op_type: operation type
+    """
+    if op_type not in OP_TYPES:
+        raise ValueError(f'Operation type must be one of {list(OP_TYPES)}, got {op_type}')
+    return op_type
+
+
+def set_op_type(docs: List[Dict], op_type: str) -> List[Dict]:
+    """
+    Return list of documents updated with an operation type; documents are left unchanged for the
+    default index operation so that any operation type they already specify is respected
+    :param docs: documents on which to set the operation type
+    :param op_type: operation type
+    """
+    if op_type == INDEX:
+        return docs
+    for doc in docs:
+        doc[OP_TYPE_FIELD] = op_type
+    return docs
+
+
+def is_partial_update(op_type: str) -> bool:
+    """
+    Return whether documents with an operation type must be converted by to_action before bulk
+    insertion
+    :param op_type: operation type
+    """
+    return op_type in (UPDATE, UPSERT)
+
+
+def to_action(doc: Dict) -> Dict:
+    """
+    Return bulk action for a flat document (with data and metadata fields at the top level),
+    nesting the data fields of update and upsert operations under the doc key; documents already
+    containing an update body (a doc, script, or _source key) are not nested
+    :param doc: document with optional operation type field
+    """
+    op_type = doc.get(OP_TYPE_FIELD, INDEX)
+    if not is_partial_update(op_type):
+        return doc
+
+    if UPDATE_BODY_FIELDS.intersection(doc):
+        action = dict(doc)
+    else:
+        action = {key: val for key, val in doc.items() if key in METADATA_FIELDS}
+        action['doc'] = {key: val for key, val in doc.items() if key not in METADATA_FIELDS}
+    action[OP_TYPE_FIELD] = UPDATE
+    if op_type == UPSERT and 'doc' in action:
+        action.setdefault('doc_as_upsert', True)
+    return action
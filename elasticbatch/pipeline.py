@@ -0,0 +1,163 @@
+import math
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from elasticbatch.ops import METADATA_FIELDS
+
+# a stage transforms a batch of documents into a new batch of documents
+Stage = Callable[[List[Dict]], List[Dict]]
+
+
+def run_pipeline(stages: Iterable[Stage], docs: List[Dict]) -> List[Dict]:
+    """
+    Return batch of documents resulting from applying each stage in order
+    :param stages: stages to apply
+    :param docs: batch of documents
+    """
+    for stage in stages:
+        docs = stage(docs)
+    return docs
+
+
+class Project:
+    """
+    Pipeline stage keeping only the specified fields (and any Elasticsearch metadata fields) of
+    each document
+    """
+
+    def __init__(self, fields: Iterable[str], keep_metadata: bool = True) -> None:
+        """
+        :param fields: names of fields to keep
+        :param keep_metadata: whether to also keep Elasticsearch metadata fields (e.g., _index)
+        """
+        self.fields = frozenset(fields)
+        self._keep = self.fields | METADATA_FIELDS if keep_metadata else self.fields
+
+    def __call__(self, docs: List[Dict]) -> List[Dict]:
+        keep = self._keep
+        return [{key: val for key, val in doc.items() if key in keep} for doc in docs]
+
+
+class DropNulls:
+    """
+    Pipeline stage removing fields with null (None or NaN) values from each document
+    """
+
+    def __init__(self, fields: Optional[Iterable[str]] = None) -> None:
+        """
+        :param fields: names of fields from which to remove null values; pass None for all fields
+          (default)
+        """
+        self.fields = None if fields is None else frozenset(fields)
+
+    def __call__(self, docs: List[Dict]) -> List[Dict]:
+        if self.fields is None:
+            return [{key: val for key, val in doc.items() if not _is_null(val)} for doc in docs]
+        fields = self.fields
+        return [
+            {key: val for key, val in doc.items() if key not in fields or not _is_null(val)}
+            for doc in docs
+        ]
+
+
+class Filter:
+    """
+    Pipeline stage keeping only documents for which a predicate is true
+    """
+
+    def __init__(self, predicate: Callable[[Dict], bool]) -> None:
+        """
+        :param predicate: function accepting a document and returning whether to keep it
+        """
+        self.predicate = predicate
+
+    def __call__(self, docs: List[Dict]) -> List[Dict]:
+        return [doc for doc in docs if self.predicate(doc)]
+
+
+class Coerce:
+    """
+    Pipeline stage converting values of fields using field-specific functions (e.g., int, str);
+    missing fields and null values are not converted
+    """
+
+    def __init__(self, **converters: Callable[[Any], Any]) -> None:
+        """
+        :param converters: functions converting the value of the field corresponding to the
+          kwarg name
+        """
+        self.converters = converters
+
+    def __call__(self, docs: List[Dict]) -> List[Dict]:
+        converters = self.converters
+        result = []
+        for doc in docs:
+            doc = dict(doc)
+            for field, convert in converters.items():
+                val = doc.get(field)
+                if not _is_null(val):
+                    doc[field] = convert(val)
+            result.append(doc)
+        return result
+
+
+class Enrich:
+    """
+    Pipeline stage adding fields to each document from a lookup keyed by the values of one or more
+    of the document's fields. Lookup results are cached in a bounded LRU cache so that the lookup
+    is called only once for documents sharing the same key.
+    """
+
+    def __init__(
+        self,
+        key_fields: Iterable[str],
+        lookup: Callable[[Any], Optional[Dict]],
+        maxsize: Optional[int] = 1024,
+    ) -> None:
+        """
+        :param key_fields: names of fields whose values form the lookup key; the key is the value
+          of the field if only one field is given and a tuple of values otherwise
+        :param lookup: function accepting a key and returning a dict of fields to add to the
+          document (or None to add nothing)
+        :param maxsize: maximum number of cached lookup results; pass None for an unbounded cache
+        """
+        self.key_fields = tuple(key_fields)
+        if not self.key_fields:
+            raise ValueError('Must specify at least one key field')
+        self._lookup = lru_cache(maxsize=maxsize)(lookup)
+
+    def __call__(self, docs: List[Dict]) -> List[Dict]:
+        result = []
+        for doc in docs:
+            fields = self._lookup_fields(self._key(doc))
+            result.append({**doc, **fields} if fields else doc)
+        return result
+
+    def cache_info(self) -> Any:
+        """
+        Get hits, misses, maxsize and currsize of the lookup cache
+        """
+        return self._lookup.cache_info()
+
+    def cache_clear(self) -> None:
+        """
+        Clear the lookup cache
+        """
+        self._lookup.cache_clear()
+
+    def _key(self, doc: Dict) -> Hashable:
+        if len(self.key_fields) == 1:
+            return doc.get(self.key_fields[0])
+        return tuple(doc.get(field) for field in self.key_fields)
+
+    def _lookup_fields(self, key: Hashable) -> Optional[Dict]:
+        try:
+            hash(key)
+        except TypeError:
+            # unhashable key cannot be cached
+            return self._lookup.__wrapped__(key)  # type: ignore
+        return self._lookup(key)
+
+
+def _is_null(val: Any) -> bool:
+    return val is None or (isinstance(val, float) and math.isnan(val))
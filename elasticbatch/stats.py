@@ -0,0 +1,33 @@
+import math
+from typing import Dict, Iterable, Sequence
+
+
+def weighted_percentiles(
+    values: Sequence[float],
+    weights: Sequence[int],
+    percentiles: Iterable[float],
+) -> Dict[float, float]:
+    """
+    Compute nearest-rank percentiles of values, each value counted the number of times given by
+    its corresponding weight
+    :param values: values for which to compute percentiles
+    :param weights: number of observations of each value
+    :param percentiles: percentiles (between 0 and 100) to compute
+    """
+    pairs = sorted((value, weight) for value, weight in zip(values, weights) if weight > 0)
+    total = sum(weight for _, weight in pairs)
+    if total == 0:
+        return {}
+
+    result = {}
+    for pct in percentiles:
+        if not 0 <= pct <= 100:
+            raise ValueError(f'Percentile must be between 0 and 100, got {pct}')
+        rank = max(math.ceil(pct / 100 * total), 1)
+        cumulative = 0
+        for value, weight in pairs:
+            cumulative += weight
+            if cumulative >= rank:
+                result[pct] = value
+                break
+    return result
@@ -0,0 +1,262 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from elasticbatch.breaker import CircuitBreaker
+from elasticbatch.exceptions import ElasticBufferCircuitOpenError
+from elasticbatch.tracing import TracedClient, Tracer
+
+# kwargs of elasticsearch.helpers.bulk that are not parameters of the bulk API
+HELPER_KWARGS = frozenset({
+    'chunk_size',
+    'max_chunk_bytes',
+    'raise_on_error',
+    'expand_action_callback',
+    'raise_on_exception',
+    'max_retries',
+    'initial_backoff',
+    'max_backoff',
+    'yield_ok',
+    'ignore_status',
+    'stats_only',
+})
+
+# a chunk is the serialized bulk request lines (action and source) of each of its documents, so
+# that the documents of a chunk can be resent individually
+Chunk = List[str]
+
+
+def encode_chunks(
+    actions: Iterable[Dict],
+    serializer: Any,
+    chunk_size: int,
+    max_chunk_bytes: int,
+) -> Iterator[Tuple[Chunk, int]]:
+    """
+    Generate chunks of serialized actions and their size in bytes, each containing at most
+    chunk_size documents and (unless a single document exceeds it) max_chunk_bytes bytes
+    :param actions: actions as accepted by elasticsearch.helpers.bulk
+    :param serializer: serializer of an elasticsearch.Elasticsearch client's transport
+    :param chunk_size: maximum number of documents per chunk
+    :param max_chunk_bytes: maximum number of bytes per chunk
+    """
+    from elasticsearch.helpers import expand_action
+
+    chunk = []  # type: Chunk
+    n_bytes = 0
+    for action in actions:
+        meta, data = expand_action(action)
+        doc = serializer.dumps(meta) + '\n'
+        if data is not None:
+            doc += serializer.dumps(data) + '\n'
+        doc_bytes = len(doc.encode())
+
+        if chunk and (len(chunk) >= chunk_size or n_bytes + doc_bytes > max_chunk_bytes):
+            yield chunk, n_bytes
+            chunk, n_bytes = [], 0
+        chunk.append(doc)
+        n_bytes += doc_bytes
+
+    if chunk:
+        yield chunk, n_bytes
+
+
+def send_chunks(
+    client: Any,
+    chunks: Iterable[Chunk],
+    bulk_kwargs: Dict[str, Any],
+) -> Tuple[int, List[Dict]]:
+    """
+    Send a bulk request for each chunk, resending documents rejected with status 429 (and requests
+    rejected entirely with status 429) with exponential backoff as configured by the max_retries,
+    initial_backoff and max_backoff bulk kwargs, as elasticsearch.helpers.bulk does; returns the
+    number of successfully processed documents and the items of failed documents
+    :param client: elasticsearch.Elasticsearch client
+    :param chunks: chunks of serialized actions
+    :param bulk_kwargs: kwargs as passed to elasticsearch.helpers.bulk
+    """
+    from elasticsearch import TransportError
+
+    request_kwargs = {key: val for key, val in bulk_kwargs.items() if key not in HELPER_KWARGS}
+    max_retries = bulk_kwargs.get('max_retries', 0)
+    initial_backoff = bulk_kwargs.get('initial_backoff', 2)
+    max_backoff = bulk_kwargs.get('max_backoff', 600)
+
+    n_success = 0
+    errors = []
+    for chunk in chunks:
+        docs = chunk
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(min(max_backoff, initial_backoff * 2 ** (attempt - 1)))
+            try:
+                resp = client.bulk(body=''.join(docs), **request_kwargs)
+            except TransportError as err:
+                if err.status_code != 429 or attempt == max_retries:
+                    raise
+                continue
+
+            rejected = []
+            for doc, item in zip(docs, resp['items']):
+                status = next(iter(item.values())).get('status', 500)
+                if 200 <= status < 300:
+                    n_success += 1
+                elif status == 429 and attempt < max_retries:
+                    rejected.append(doc)
+                else:
+                    errors.append(item)
+            if not rejected:
+                break
+            docs = rejected
+    return n_success, errors
+
+
+class Target:
+    """
+    Additional Elasticsearch cluster to which an elasticbatch.ElasticBuffer writes. A mirror target
+    receives every flush in addition to the buffer's (primary) cluster, whereas a failover target
+    receives flushes in place of the primary cluster while the buffer's circuit breaker is open.
+    Each mirror target sends requests from its own thread, so a slow target does not block other
+    targets until it falls more than max_pending bulk requests behind.
+    """
+
+    MIRROR = 'mirror'
+    FAILOVER = 'failover'
+
+    def __init__(
+        self,
+        name: str,
+        client_kwargs: Optional[Dict[str, Any]] = None,
+        role: str = MIRROR,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        required: bool = False,
+        max_pending: int = 4,
+    ) -> None:
+        """
+        :param name: name identifying the target
+        :param client_kwargs: dict of kwargs for elasticsearch.Elasticsearch client configuration
+        :param role: mirror (default) or failover
+        :param circuit_breaker: optional elasticbatch.breaker.CircuitBreaker for skipping the
+          target while it is unavailable
+        :param required: whether a flush fails (raising ElasticBufferFlushError and keeping the
+          buffer contents) when writing to this mirror target fails; flushes to non-required
+          targets are not waited for and their failures are only recorded
+        :param max_pending: maximum number of bulk requests that can be queued or in progress
+          before flushing waits for the target to catch up
+        """
+        if role not in (self.MIRROR, self.FAILOVER):
+            raise ValueError(f'Target role must be one of {[self.MIRROR, self.FAILOVER]}')
+        if max_pending < 1:
+            raise ValueError('max_pending must be at least 1')
+
+        self.name = name
+        self.role = role
+        self.circuit_breaker = circuit_breaker
+        self.required = required
+        self.max_pending = max_pending
+
+        self.n_success = 0
+        self.n_errors = 0
+        self.last_error = None  # type: Optional[Any]
+
+        self._client = self._create_client(client_kwargs)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f'elasticbatch-{name}')
+        self._pending = deque()  # type: Deque[Future]
+        self._pending_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def __str__(self):
+        return f'{self.__class__.__name__} {self.name} ({self.role})'
+
+    @property
+    def available(self) -> bool:
+        """
+        Whether the target's circuit breaker (if any) is not open
+        """
+        return self.circuit_breaker is None or self.circuit_breaker.state != CircuitBreaker.OPEN
+
+    def submit(
+        self,
+        chunk: Chunk,
+        bulk_kwargs: Dict[str, Any],
+        tracer: Optional[Tracer] = None,
+    ) -> 'Future[Tuple[int, List[Dict]]]':
+        """
+        Queue a chunk to be sent from the target's thread, first waiting for the oldest pending
+        request to complete if max_pending requests are pending; returns a future of the number of
+        successfully processed documents and the items of failed documents
+        :param chunk: serialized actions of the documents to send
+        :param bulk_kwargs: kwargs as passed to elasticsearch.helpers.bulk
+        :param tracer: optional tracer with which to record bulk requests
+        """
+        with self._pending_lock:
+            while self._pending and self._pending[0].done():
+                self._pending.popleft()
+            while len(self._pending) >= self.max_pending:
+                self._pending.popleft().exception()  # wait without raising
+            future = self._executor.submit(self.send, [chunk], bulk_kwargs, tracer)
+            self._pending.append(future)
+        return future
+
+    def send(
+        self,
+        chunks: List[Chunk],
+        bulk_kwargs: Dict[str, Any],
+        tracer: Optional[Tracer] = None,
+    ) -> Tuple[int, List[Dict]]:
+        """
+        Send a bulk request for each chunk, recording the result with the target's statistics and
+        circuit breaker; returns the number of successfully processed documents and the items of
+        failed documents
+        :param chunks: chunks of serialized actions
+        :param bulk_kwargs: kwargs as passed to elasticsearch.helpers.bulk
+        :param tracer: optional tracer with which to record bulk requests
+        """
+        from elasticsearch import ElasticsearchException
+
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow_request():
+            err = ElasticBufferCircuitOpenError(
+                msg=f'Circuit breaker of target {self.name} is open')
+            self._record(0, 1, err)
+            raise err
+
+        client = self._client if tracer is None else TracedClient(self._client, tracer)
+        try:
+            n_success, errors = send_chunks(client, chunks, bulk_kwargs)
+        except ElasticsearchException as err:
+            self._record(0, 1, err)
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.release_probe()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        self._record(n_success, len(errors), errors[0] if errors else None)
+        return n_success, errors
+
+    def wait(self) -> None:
+        """
+        Wait for all pending requests to the target to complete
+        """
+        with self._pending_lock:
+            while self._pending:
+                self._pending.popleft().exception()
+
+    def _record(self, n_success: int, n_errors: int, err: Optional[Any]) -> None:
+        with self._stats_lock:
+            self.n_success += n_success
+            self.n_errors += n_errors
+            if err is not None:
+                self.last_error = err
+
+    @staticmethod
+    def _create_client(client_kwargs: Optional[Dict[str, Any]]) -> Any:
+        from elasticsearch import Elasticsearch
+        return Elasticsearch(**client_kwargs) if client_kwargs else Elasticsearch()
@@ -0,0 +1,124 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class Throttle:
+    """
+    Token bucket rate limiter capping the number of documents and bytes per second flushed to
+    Elasticsearch. A single instance can be shared by multiple elasticbatch.ElasticBuffer instances
+    and threads, in which case the limits apply to all of them combined. Limits can be changed at
+    any time by setting the docs_per_sec and bytes_per_sec attributes.
+    """
+
+    def __init__(
+        self,
+        docs_per_sec: Optional[float] = None,
+        bytes_per_sec: Optional[float] = None,
+        burst: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        :param docs_per_sec: maximum number of documents per second; pass None for no limit
+          (default)
+        :param bytes_per_sec: maximum number of (serialized) bytes per second; pass None for no
+          limit (default)
+        :param burst: number of seconds worth of tokens that can accumulate while idle, allowing
+          short bursts above the limits
+        :param clock: function returning monotonic time in seconds
+        :param sleep: function used to wait for a number of seconds
+        """
+        if burst <= 0:
+            raise ValueError('burst must be positive')
+
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self._docs_per_sec = self._validate_rate(docs_per_sec)
+        self._bytes_per_sec = self._validate_rate(bytes_per_sec)
+        self._doc_tokens = self._capacity(self._docs_per_sec)
+        self._byte_tokens = self._capacity(self._bytes_per_sec)
+        self._last_refill = clock()
+
+    @property
+    def docs_per_sec(self) -> Optional[float]:
+        return self._docs_per_sec
+
+    @docs_per_sec.setter
+    def docs_per_sec(self, rate: Optional[float]) -> None:
+        rate = self._validate_rate(rate)
+        with self._lock:
+            self._refill()
+            self._docs_per_sec = rate
+            self._doc_tokens = min(self._doc_tokens, self._capacity(rate))
+
+    @property
+    def bytes_per_sec(self) -> Optional[float]:
+        return self._bytes_per_sec
+
+    @bytes_per_sec.setter
+    def bytes_per_sec(self, rate: Optional[float]) -> None:
+        rate = self._validate_rate(rate)
+        with self._lock:
+            self._refill()
+            self._bytes_per_sec = rate
+            self._byte_tokens = min(self._byte_tokens, self._capacity(rate))
+
+    @property
+    def limits_bytes(self) -> bool:
+        """
+        Whether a limit on bytes per second is set
+        """
+        return self._bytes_per_sec is not None
+
+    def acquire(self, n_docs: int = 1, n_bytes: int = 0) -> float:
+        """
+        Take tokens for sending documents, waiting until the rate limits allow them to be sent;
+        returns the number of seconds waited
+        :param n_docs: number of documents to be sent
+        :param n_bytes: number of bytes to be sent
+        """
+        with self._lock:
+            self._refill()
+            wait = 0.0
+            if self._docs_per_sec is not None:
+                self._doc_tokens -= n_docs
+                wait = max(wait, -self._doc_tokens / self._docs_per_sec)
+            if self._bytes_per_sec is not None:
+                self._byte_tokens -= n_bytes
+                wait = max(wait, -self._byte_tokens / self._bytes_per_sec)
+
+        # tokens are reserved before waiting so that concurrent callers queue behind each other
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def _refill(self) -> None:
+        """
+        Add tokens accumulated since last refill; must be called while holding the lock
+        """
+        now = self._clock()
+        elapsed = max(now - self._last_refill, 0.0)
+        self._last_refill = now
+        if self._docs_per_sec is not None:
+            self._doc_tokens = min(
+                self._doc_tokens + elapsed * self._docs_per_sec,
+                self._capacity(self._docs_per_sec),
+            )
+        if self._bytes_per_sec is not None:
+            self._byte_tokens = min(
+                self._byte_tokens + elapsed * self._bytes_per_sec,
+                self._capacity(self._bytes_per_sec),
+            )
+
+    def _capacity(self, rate: Optional[float]) -> float:
+        return 0.0 if rate is None else rate * self.burst
+
+    @staticmethod
+    def _validate_rate(rate: Optional[float]) -> Optional[float]:
+        if rate is not None and rate <= 0:
+            raise ValueError('Rate limit must be positive or None')
+        return rate
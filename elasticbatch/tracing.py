@@ -0,0 +1,107 @@
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional
+
+
+class Tracer(ABC):
+    """
+    Base class of tracers recording the duration and attributes of the phases (spans) of adding
+    documents to and flushing an elasticbatch.ElasticBuffer. Subclasses implement span.
+    """
+
+    @abstractmethod
+    def span(self, name: str, **attributes: Any) -> ContextManager[Dict[str, Any]]:
+        """
+        Return context manager timing a span; the context manager yields a dict of the span's
+        attributes to which further attributes can be added before the span ends
+        :param name: name of the span
+        :param attributes: initial attributes of the span
+        """
+
+
+class CallbackTracer(Tracer):
+    """
+    Tracer calling a function with the name, duration in seconds, and attributes of each span when
+    it ends
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[str, float, Dict[str, Any]], None],
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """
+        :param callback: function accepting the name, duration, and attributes of a span
+        :param clock: function returning monotonic time in seconds
+        """
+        self.callback = callback
+        self._clock = clock
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        start = self._clock()
+        try:
+            yield attributes
+        except BaseException as err:
+            attributes['error'] = f'{err.__class__.__name__}: {err}'
+            raise
+        finally:
+            self.callback(name, self._clock() - start, attributes)
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Tracer recording spans with an OpenTelemetry tracer, naming each span elasticbatch.<name>
+    """
+
+    def __init__(self, tracer: Any) -> None:
+        """
+        :param tracer: opentelemetry.trace.Tracer, e.g., from opentelemetry.trace.get_tracer
+        """
+        self.tracer = tracer
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        with self.tracer.start_as_current_span(f'elasticbatch.{name}') as span:
+            try:
+                yield attributes
+            finally:
+                for key, val in attributes.items():
+                    if val is not None:
+                        span.set_attribute(key, val)
+
+
+class TracedClient:
+    """
+    Proxy of an elasticsearch.Elasticsearch client recording a span for every bulk request,
+    including the server-reported time (took) in milliseconds taken to process the request
+    """
+
+    def __init__(self, client: Any, tracer: Tracer) -> None:
+        """
+        :param client: elasticsearch.Elasticsearch client
+        :param tracer: tracer with which to record spans
+        """
+        self._client = client
+        self._tracer = tracer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def bulk(self, *args: Any, **kwargs: Any) -> Any:
+        body = kwargs.get('body', args[0] if args else None)
+        with self._tracer.span('bulk_request', body_bytes=_size(body)) as attributes:
+            resp = self._client.bulk(*args, **kwargs)
+            attributes['took'] = resp.get('took')
+            attributes['errors'] = resp.get('errors')
+            attributes['n_items'] = len(resp.get('items', []))
+        return resp
+
+
+def _size(body: Any) -> Optional[int]:
+    if isinstance(body, str):
+        return len(body.encode())
+    if isinstance(body, bytes):
+        return len(body)
+    return None
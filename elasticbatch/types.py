@@ -1,13 +1,31 @@
-from typing import Dict, List, Union
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Dict, List, Union
 
-try:
+if TYPE_CHECKING:
     import pandas as pd
-    no_pandas = False
-except ImportError:
-    no_pandas = True
-
-# DocumentBundle includes pandas Series and DataFrame when pandas is imported
-if no_pandas:
-    DocumentBundle = Union[Dict, List[Dict]]
-else:
-    DocumentBundle = Union[Dict, List[Dict], pd.Series, pd.DataFrame]  # type: ignore
+    DocumentBundle = Union[Dict, List[Dict], pd.Series, pd.DataFrame]
+    no_pandas: bool
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Lazily construct module attributes so that pandas is only imported when these are accessed
+    rather than when elasticbatch is imported
+    """
+    if name == 'no_pandas':
+        value = find_spec('pandas') is None  # type: Any
+    elif name == 'DocumentBundle':
+        value = _document_bundle()
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+
+def _document_bundle() -> Any:
+    # DocumentBundle includes pandas Series and DataFrame when pandas is installed
+    try:
+        import pandas as pd
+    except ImportError:
+        return Union[Dict, List[Dict]]
+    return Union[Dict, List[Dict], pd.Series, pd.DataFrame]
@@ -11,7 +11,8 @@ requirements = [
 ]
 
 extras = {
-   'pandas': ['pandas']
+   'pandas': ['pandas'],
+   'xxhash': ['xxhash'],
 }
 
 keywords = [
@@ -27,8 +28,8 @@ classifiers = [
     'License :: OSI Approved :: MIT License',
     'Natural Language :: English',
     'Operating System :: OS Independent',
-    'Programming Language :: Python :: 3.6',
     'Programming Language :: Python :: 3.7',
+    'Programming Language :: Python :: 3.8',
 ]
 
 setup(
@@ -41,6 +42,7 @@ setup(
     long_description=long_description,
     long_description_content_type='text/markdown',
     packages=find_packages(),
+    python_requires='>=3.7',
     install_requires=requirements,
     extras_require=extras,
     url='https://github.com/dkaslovsky/ElasticBatch',
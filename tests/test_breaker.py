@@ -0,0 +1,106 @@
+import unittest
+
+from elasticbatch.breaker import CircuitBreaker
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_state_transitions(self):
+
+        class TestCase:
+            def __init__(self, events, expected_state, expected_allow):
+                self.events = events
+                self.expected_state = expected_state
+                self.expected_allow = expected_allow
+
+        # events are 'f' (failure), 's' (success), 'a' (allow_request), 'r' (release_probe), or a
+        # number of seconds
+        tests = {
+            'initially closed': TestCase(
+                events=[],
+                expected_state=CircuitBreaker.CLOSED,
+                expected_allow=True,
+            ),
+            'failures below threshold': TestCase(
+                events=['f', 'f'],
+                expected_state=CircuitBreaker.CLOSED,
+                expected_allow=True,
+            ),
+            'success resets failure count': TestCase(
+                events=['f', 'f', 's', 'f', 'f'],
+                expected_state=CircuitBreaker.CLOSED,
+                expected_allow=True,
+            ),
+            'failures reaching threshold': TestCase(
+                events=['f', 'f', 'f'],
+                expected_state=CircuitBreaker.OPEN,
+                expected_allow=False,
+            ),
+            'open before reset timeout': TestCase(
+                events=['f', 'f', 'f', 9.9],
+                expected_state=CircuitBreaker.OPEN,
+                expected_allow=False,
+            ),
+            'half-open after reset timeout': TestCase(
+                events=['f', 'f', 'f', 10],
+                expected_state=CircuitBreaker.HALF_OPEN,
+                expected_allow=True,
+            ),
+            'half-open allows only one probe': TestCase(
+                events=['f', 'f', 'f', 10, 'a'],
+                expected_state=CircuitBreaker.HALF_OPEN,
+                expected_allow=False,
+            ),
+            'successful probe closes': TestCase(
+                events=['f', 'f', 'f', 10, 'a', 's'],
+                expected_state=CircuitBreaker.CLOSED,
+                expected_allow=True,
+            ),
+            'failed probe opens': TestCase(
+                events=['f', 'f', 'f', 10, 'a', 'f'],
+                expected_state=CircuitBreaker.OPEN,
+                expected_allow=False,
+            ),
+            'released probe allows another probe': TestCase(
+                events=['f', 'f', 'f', 10, 'a', 'r'],
+                expected_state=CircuitBreaker.HALF_OPEN,
+                expected_allow=True,
+            ),
+            'half-open again after failed probe and reset timeout': TestCase(
+                events=['f', 'f', 'f', 10, 'a', 'f', 10],
+                expected_state=CircuitBreaker.HALF_OPEN,
+                expected_allow=True,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            clock = FakeClock()
+            breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+            for event in test.events:
+                if event == 'f':
+                    breaker.record_failure()
+                elif event == 's':
+                    breaker.record_success()
+                elif event == 'a':
+                    breaker.allow_request()
+                elif event == 'r':
+                    breaker.release_probe()
+                else:
+                    clock.now += event
+
+            self.assertEqual(breaker.state, test.expected_state, test_name)
+            self.assertEqual(breaker.allow_request(), test.expected_allow, test_name)
+
+    def test_invalid_params(self):
+        for kwargs in [{'failure_threshold': 0}, {'reset_timeout': -1}]:
+            with self.assertRaises(ValueError, msg=kwargs):
+                _ = CircuitBreaker(**kwargs)
@@ -2,12 +2,22 @@ import json
 import math
 import os
 import unittest
-from unittest.mock import mock_open, patch
+from unittest.mock import MagicMock, mock_open, patch
 
-from elasticsearch import ElasticsearchException
+from elasticsearch import ConnectionError as ESConnectionError
+from elasticsearch import ElasticsearchException, TransportError
+from elasticsearch.serializer import JSONSerializer
 
 from elasticbatch.buffer import ElasticBuffer
-from elasticbatch.exceptions import ElasticBufferFlushError
+from elasticbatch.breaker import CircuitBreaker
+from elasticbatch.exceptions import (ElasticBatchError, ElasticBufferCircuitOpenError,
+                                     ElasticBufferFlushError)
+from elasticbatch.ids import IdStrategy
+from elasticbatch.metadata import depends_on
+from elasticbatch.pipeline import Filter, Project
+from elasticbatch.targets import Target
+from elasticbatch.throttle import Throttle
+from elasticbatch.tracing import CallbackTracer
 
 try:
     import pandas as pd
@@ -189,6 +199,548 @@ class TestElasticBuffer(unittest.TestCase):
             'timestamp should be None after successful insert'
         )
 
+    @patch.object(ElasticBuffer, 'flush')
+    def test__add_linger(self, mock_flush):
+
+        class TestCase:
+            def __init__(self, linger, timestamps, expected_flush_called):
+                self.timestamps = timestamps
+                self.expected_flush_called = expected_flush_called
+                self.eb = ElasticBuffer(linger=linger)
+
+        tests = {
+            'no linger': TestCase(
+                linger=None,
+                timestamps=[100, 10000],
+                expected_flush_called=False,
+            ),
+            'oldest document younger than linger': TestCase(
+                linger=5,
+                timestamps=[100, 101, 104.9],
+                expected_flush_called=False,
+            ),
+            'oldest document as old as linger': TestCase(
+                linger=5,
+                timestamps=[100, 101, 105],
+                expected_flush_called=True,
+            ),
+            'zero linger': TestCase(
+                linger=0,
+                timestamps=[100],
+                expected_flush_called=True,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_flush.reset_mock()
+            mock_flush.side_effect = test.eb._clear_buffer
+
+            for timestamp in test.timestamps:
+                test.eb._add([self.docs[0]], timestamp=timestamp)
+
+            if test.expected_flush_called:
+                mock_flush.assert_called_once()
+            else:
+                mock_flush.assert_not_called()
+
+    @patch(f'{ElasticBuffer.__module__}.time.time')
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_flush_latency(self, mock_bulk, mock_time):
+        mock_bulk.return_value = (100, [])
+        mock_time.return_value = 200.0
+
+        eb = ElasticBuffer()
+        self.assertDictEqual(eb.last_flush_latency, {}, 'no latency before first flush')
+
+        eb._add([self.docs[0]] * 90, timestamp=199.0)
+        eb._add([self.docs[0]] * 9, timestamp=190.0)
+        eb._add([self.docs[0]], timestamp=100.0)
+        expected = {50: 1.0, 95: 10.0, 99: 10.0}
+        self.assertDictEqual(eb.elapsed_time_percentiles, expected)
+
+        eb.flush()
+        self.assertDictEqual(eb.last_flush_latency, expected)
+        self.assertDictEqual(eb.elapsed_time_percentiles, {}, 'buffer should be empty')
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_flush_throttled(self, mock_bulk):
+
+        class TestCase:
+            def __init__(self, bytes_per_sec, expected_bytes):
+                self.throttle = MagicMock(spec=Throttle)
+                self.throttle.limits_bytes = bytes_per_sec is not None
+                self.expected_bytes = expected_bytes
+
+        tests = {
+            'docs limit only': TestCase(
+                bytes_per_sec=None,
+                expected_bytes=[0] * len(self.docs),
+            ),
+            'bytes limit': TestCase(
+                bytes_per_sec=1000,
+                expected_bytes=[len(json.dumps(doc, separators=(',', ':'))) for doc in self.docs],
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_bulk.reset_mock()
+            mock_bulk.side_effect = lambda client, docs, **kwargs: (len(list(docs)), [])
+
+            eb = ElasticBuffer(throttle=test.throttle)
+            eb._buffer = self.docs
+            eb.flush()
+
+            acquire_call_args = [args for args, _ in test.throttle.acquire.call_args_list]
+            self.assertListEqual(
+                acquire_call_args,
+                [(1, n_bytes) for n_bytes in test.expected_bytes],
+                test_name,
+            )
+            self.assertListEqual(eb._buffer, [], test_name)
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_flush_circuit_breaker(self, mock_bulk):
+
+        class TestCase:
+            def __init__(
+                self,
+                breaker_state,
+                side_effect=None,
+                ping=True,
+                expected_err=None,
+                expected_bulk_called=True,
+                expected_breaker_state=CircuitBreaker.CLOSED,
+            ):
+                self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+                if breaker_state != CircuitBreaker.CLOSED:
+                    self.breaker.record_failure()
+                if breaker_state == CircuitBreaker.HALF_OPEN:
+                    self.breaker.reset_timeout = 0
+
+                self.eb = ElasticBuffer(circuit_breaker=self.breaker)
+                self.eb._buffer = TestElasticBuffer.docs
+                self.eb._client = MagicMock()
+                self.eb._client.ping.return_value = ping
+
+                self.side_effect = side_effect
+                self.expected_err = expected_err
+                self.expected_bulk_called = expected_bulk_called
+                self.expected_breaker_state = expected_breaker_state
+
+        tests = {
+            'closed breaker with successful flush': TestCase(
+                breaker_state=CircuitBreaker.CLOSED,
+            ),
+            'closed breaker with connection error': TestCase(
+                breaker_state=CircuitBreaker.CLOSED,
+                side_effect=ESConnectionError('N/A', 'connection refused'),
+                expected_err=ElasticBufferFlushError,
+                expected_breaker_state=CircuitBreaker.OPEN,
+            ),
+            'closed breaker with server error': TestCase(
+                breaker_state=CircuitBreaker.CLOSED,
+                side_effect=TransportError(503, 'unavailable'),
+                expected_err=ElasticBufferFlushError,
+                expected_breaker_state=CircuitBreaker.OPEN,
+            ),
+            'closed breaker with client error': TestCase(
+                breaker_state=CircuitBreaker.CLOSED,
+                side_effect=TransportError(400, 'bad request'),
+                expected_err=ElasticBufferFlushError,
+                expected_breaker_state=CircuitBreaker.CLOSED,
+            ),
+            'open breaker': TestCase(
+                breaker_state=CircuitBreaker.OPEN,
+                expected_err=ElasticBufferCircuitOpenError,
+                expected_bulk_called=False,
+                expected_breaker_state=CircuitBreaker.OPEN,
+            ),
+            'half-open breaker with successful probe': TestCase(
+                breaker_state=CircuitBreaker.HALF_OPEN,
+            ),
+            'half-open breaker with failed probe': TestCase(
+                breaker_state=CircuitBreaker.HALF_OPEN,
+                ping=False,
+                expected_err=ElasticBufferCircuitOpenError,
+                expected_bulk_called=False,
+                expected_breaker_state=CircuitBreaker.HALF_OPEN,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_bulk.reset_mock()
+            mock_bulk.return_value = (len(self.docs), [])
+            mock_bulk.side_effect = test.side_effect
+
+            if test.expected_err is None:
+                test.eb.flush()
+            else:
+                with self.assertRaises(test.expected_err, msg=test_name):
+                    test.eb.flush()
+
+            self.assertEqual(mock_bulk.called, test.expected_bulk_called, test_name)
+            self.assertEqual(test.breaker.state, test.expected_breaker_state, test_name)
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_flush_circuit_breaker_unrelated_error(self, mock_bulk):
+        mock_bulk.side_effect = lambda client, docs, **kwargs: (len(list(docs)), [])
+
+        def _failing_stage(docs):
+            raise RuntimeError('stage failed')
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()  # half-open as reset timeout is zero
+        eb = ElasticBuffer(circuit_breaker=breaker, stages=[_failing_stage])
+        eb._buffer = list(self.docs)
+        eb._client = MagicMock()
+        eb._client.ping.return_value = True
+
+        with self.assertRaises(RuntimeError):
+            eb.flush()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow_request(), 'probe should be released after unrelated error')
+        breaker.release_probe()
+
+        eb.stages = []
+        eb.flush()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(len(eb), 0)
+
+    def test_flush_targets(self):
+
+        def _client(status=201, side_effect=None):
+            client = MagicMock()
+            client.transport.serializer = JSONSerializer()
+            client.bulk.side_effect = side_effect or (lambda body, **kwargs: {
+                'items': [{'index': {'status': status}}] * (len(body.splitlines()) // 2),
+            })
+            return client
+
+        def _target(name, role=Target.MIRROR, required=False, client=None):
+            target = Target(name, role=role, required=required)
+            target._client = client or _client()
+            return target
+
+        class TestCase:
+            def __init__(
+                self,
+                targets,
+                breaker_open=False,
+                primary=None,
+                expected_err=None,
+                expected_n_bulk_calls=None,
+            ):
+                self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+                if breaker_open:
+                    self.breaker.record_failure()
+                self.targets = targets
+                self.eb = ElasticBuffer(
+                    bulk_kwargs={'chunk_size': 3},
+                    circuit_breaker=self.breaker,
+                    targets=targets,
+                )
+                self.eb._client = primary or _client()
+                self.eb._buffer = list(TestElasticBuffer.docs)
+                self.expected_err = expected_err
+                self.expected_n_bulk_calls = expected_n_bulk_calls or {}
+
+        unavailable = ESConnectionError('N/A', 'connection refused')
+        tests = {
+            'mirrors': TestCase(
+                targets=[_target('mirror1'), _target('mirror2', required=True)],
+                expected_n_bulk_calls={'primary': 2, 'mirror1': 2, 'mirror2': 2},
+            ),
+            'failing mirror': TestCase(
+                targets=[_target('mirror1', client=_client(side_effect=unavailable))],
+                expected_n_bulk_calls={'primary': 2, 'mirror1': 2},
+            ),
+            'failing required mirror': TestCase(
+                targets=[_target('mirror1', required=True, client=_client(status=400))],
+                expected_err=ElasticBufferFlushError,
+                expected_n_bulk_calls={'primary': 2, 'mirror1': 2},
+            ),
+            'failover with closed breaker': TestCase(
+                targets=[_target('failover1', role=Target.FAILOVER)],
+                expected_n_bulk_calls={'primary': 2, 'failover1': 0},
+            ),
+            'failover with open breaker': TestCase(
+                targets=[_target('failover1', role=Target.FAILOVER), _target('mirror1')],
+                breaker_open=True,
+                expected_n_bulk_calls={'primary': 0, 'failover1': 2, 'mirror1': 2},
+            ),
+            'open breaker without failover': TestCase(
+                targets=[_target('mirror1')],
+                breaker_open=True,
+                expected_err=ElasticBufferCircuitOpenError,
+                expected_n_bulk_calls={'primary': 0, 'mirror1': 0},
+            ),
+        }
+
+        for test_name, test in tests.items():
+            if test.expected_err is None:
+                test.eb.flush()
+                self.assertEqual(len(test.eb), 0, test_name)
+            else:
+                with self.assertRaises(test.expected_err, msg=test_name):
+                    test.eb.flush()
+                self.assertEqual(len(test.eb), len(self.docs), test_name)
+
+            for target in test.targets:
+                target.wait()
+            n_bulk_calls = {'primary': test.eb._client.bulk.call_count}
+            n_bulk_calls.update({t.name: t._client.bulk.call_count for t in test.targets})
+            self.assertDictEqual(n_bulk_calls, test.expected_n_bulk_calls, test_name)
+
+    def test_flush_targets_throttled(self):
+        events = []
+
+        throttle = MagicMock()
+        throttle.limits_bytes = True
+        throttle.acquire.side_effect = lambda n_docs, n_bytes: events.append(('acquire', n_docs))
+
+        def _bulk(body, **kwargs):
+            n_docs = len(body.splitlines()) // 2
+            events.append(('bulk', n_docs))
+            return {'items': [{'index': {'status': 201}}] * n_docs}
+
+        eb = ElasticBuffer(bulk_kwargs={'chunk_size': 3}, throttle=throttle, targets=[
+            Target('mirror1', role=Target.FAILOVER),
+        ])
+        eb._client = MagicMock()
+        eb._client.transport.serializer = JSONSerializer()
+        eb._client.bulk.side_effect = _bulk
+        eb._buffer = list(self.docs)
+        eb.flush()
+
+        self.assertListEqual(
+            events,
+            [('acquire', 3), ('bulk', 3), ('acquire', 1), ('bulk', 1)],
+            'throttle should be acquired just before each request is sent',
+        )
+        doc_bytes = len(b'{"index":{}}\n{"a":1,"b":2.1,"c":"xyz"}\n')
+        self.assertEqual(throttle.acquire.call_args_list[1][0], (1, doc_bytes))
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_add_priority(self, mock_bulk):
+
+        class TestCase:
+            def __init__(self, adds, expected_bulk_calls, expected_lens):
+                self.adds = adds
+                self.expected_bulk_calls = expected_bulk_calls
+                self.expected_lens = expected_lens
+
+        alerts_kwargs = {'max_retries': 3, 'chunk_size': 2, 'refresh': 'wait_for'}
+        tests = {
+            'documents added to lanes by priority': TestCase(
+                adds=[(None, 1, 0.0), ('alerts', 1, 0.0), ('bulk', 1, 0.0)],
+                expected_bulk_calls=[],
+                expected_lens={None: 1, 'alerts': 1, 'bulk': 1},
+            ),
+            'full lane flushed with lane bulk kwargs': TestCase(
+                adds=[(None, 1, 0.0), ('alerts', 3, 0.0)],
+                expected_bulk_calls=[(3, alerts_kwargs)],
+                expected_lens={None: 1, 'alerts': 0, 'bulk': 0},
+            ),
+            'lingering lane flushed when adding without priority': TestCase(
+                adds=[('alerts', 1, 0.0), ('bulk', 1, 0.0), (None, 1, 0.5)],
+                expected_bulk_calls=[(1, alerts_kwargs)],
+                expected_lens={None: 1, 'alerts': 0, 'bulk': 1},
+            ),
+            'full buffer flushes all lanes': TestCase(
+                adds=[('alerts', 1, 0.0), ('bulk', 1, 0.0), (None, 11, 0.0)],
+                expected_bulk_calls=[
+                    (1, alerts_kwargs),
+                    (1, {'max_retries': 3, 'chunk_size': 100}),
+                    (11, {'max_retries': 3, 'chunk_size': 10}),
+                ],
+                expected_lens={None: 0, 'alerts': 0, 'bulk': 0},
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_bulk.reset_mock()
+            bulk_calls = []
+
+            def _bulk(client, docs, **kwargs):
+                n_docs = len(list(docs))
+                bulk_calls.append((n_docs, kwargs))
+                return n_docs, []
+
+            mock_bulk.side_effect = _bulk
+
+            eb = ElasticBuffer(size=10, lanes={
+                'alerts': {'size': 2, 'linger': 0.5, 'bulk_kwargs': {'refresh': 'wait_for'}},
+                'bulk': {'size': 100},
+            })
+            for priority, n_docs, timestamp in test.adds:
+                eb.add([dict(self.docs[0])] * n_docs, timestamp=timestamp, priority=priority)
+
+            self.assertListEqual(bulk_calls, test.expected_bulk_calls, test_name)
+            lens = {None: len(eb), **{name: len(lane) for name, lane in eb.lanes.items()}}
+            self.assertDictEqual(lens, test.expected_lens, test_name)
+
+        eb = ElasticBuffer(lanes={'alerts': {'size': 2}})
+        self.assertIs(eb.lanes['alerts']._client, eb._client, 'lanes should share the client')
+        with self.assertRaises(ValueError):
+            eb.add(self.docs, priority='missing')
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_add_source_position(self, mock_bulk):
+
+        class TestCase:
+            def __init__(self, steps, expected_commits, expected_committed, n_commit_errs=0):
+                self.steps = steps
+                self.expected_commits = expected_commits
+                self.expected_committed = expected_committed
+                self.n_commit_errs = n_commit_errs
+
+        def _add(offset, n_docs=1, partition='p0', priority=None):
+            return lambda eb: eb.add(
+                [dict(TestElasticBuffer.docs[0])] * n_docs,
+                priority=priority,
+                source_position=(partition, offset),
+            )
+
+        def _flush(eb):
+            eb.flush()
+
+        def _failed_flush(eb):
+            mock_bulk.side_effect = ElasticsearchException
+            with self.assertRaises(ElasticBufferFlushError):
+                eb.flush()
+            mock_bulk.side_effect = lambda client, docs, **kwargs: (len(list(docs)), [])
+
+        def _flush_commit_err(eb):
+            with self.assertRaises(RuntimeError):
+                eb.flush()
+            self.assertEqual(len(eb), 0, 'flushed documents should be cleared')
+
+        tests = {
+            'positions committed on flush': TestCase(
+                steps=[_add(1), _add(2, partition='p1'), _add(3), _flush],
+                expected_commits=[{'p0': 3, 'p1': 2}],
+                expected_committed={'p0': 3, 'p1': 2},
+            ),
+            'positions committed on implicit flush when full': TestCase(
+                steps=[_add(1), _add(2, n_docs=10), _add(3)],
+                expected_commits=[{'p0': 2}],
+                expected_committed={'p0': 2},
+            ),
+            'positions not committed on failed flush': TestCase(
+                steps=[_add(1), _failed_flush, _add(2), _flush],
+                expected_commits=[{'p0': 2}],
+                expected_committed={'p0': 2},
+            ),
+            'position without documents committed immediately when empty': TestCase(
+                steps=[_add(1, n_docs=0), _add(2), _add(3, n_docs=0)],
+                expected_commits=[{'p0': 1}],
+                expected_committed={'p0': 1},
+            ),
+            'lane flushed out of order does not commit past pending position': TestCase(
+                steps=[_add(1, priority='bulk'), _add(2, priority='alerts', n_docs=3),
+                       _add(3, priority='bulk'), _flush],
+                expected_commits=[{'p0': 3}],
+                expected_committed={'p0': 3},
+            ),
+            'positions of failed commit delivered again on next flush': TestCase(
+                steps=[_add(1), _add(2, partition='p1'), _flush_commit_err, _add(3), _flush],
+                expected_commits=[{'p0': 1, 'p1': 2}, {'p0': 3}],
+                expected_committed={'p0': 3, 'p1': 2},
+                n_commit_errs=1,
+            ),
+            'positions of failed commit delivered again on flush of empty buffer': TestCase(
+                steps=[_add(1), _flush_commit_err, _flush],
+                expected_commits=[{'p0': 1}],
+                expected_committed={'p0': 1},
+                n_commit_errs=1,
+            ),
+            'positions of failed commit in lane delivered again on flush': TestCase(
+                steps=[_add(1, priority='bulk'), _flush_commit_err, _add(2), _flush],
+                expected_commits=[{'p0': 1}, {'p0': 2}],
+                expected_committed={'p0': 2},
+                n_commit_errs=1,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_bulk.reset_mock()
+            mock_bulk.side_effect = lambda client, docs, **kwargs: (len(list(docs)), [])
+            commits = []
+            n_commit_errs = [test.n_commit_errs]
+
+            def _on_commit(positions):
+                if n_commit_errs[0] > 0:
+                    n_commit_errs[0] -= 1
+                    raise RuntimeError('commit failed')
+                commits.append(positions)
+
+            eb = ElasticBuffer(
+                size=10,
+                on_commit=_on_commit,
+                lanes={'alerts': {'size': 2}, 'bulk': {'size': 100}},
+            )
+            for step in test.steps:
+                step(eb)
+
+            self.assertListEqual(commits, test.expected_commits, test_name)
+            self.assertDictEqual(eb.committed_positions, test.expected_committed, test_name)
+
+        with self.assertRaises(ValueError):
+            ElasticBuffer().add(self.docs, source_position=5)
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_flush_pipeline(self, mock_bulk):
+        actions = []
+
+        def _bulk(client, docs, **kwargs):
+            actions.extend(docs)
+            return len(actions), []
+
+        mock_bulk.side_effect = _bulk
+
+        eb = ElasticBuffer(
+            bulk_kwargs={'chunk_size': 3},
+            stages=[Filter(lambda doc: doc['a'] > 1), Project(['a'])],
+        )
+        eb.add([dict(doc) for doc in self.docs])
+        eb.flush()
+
+        self.assertListEqual(actions, [{'a': 3}, {'a': 5}, {'a': 7}])
+        self.assertEqual(len(eb), 0, 'filtered documents should not count as failures')
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_tracing(self, mock_bulk):
+
+        def _bulk(client, docs, **kwargs):
+            docs = list(docs)
+            client.bulk(body='\n'.join(json.dumps(doc) for doc in docs) + '\n')
+            return len(docs), []
+
+        mock_bulk.side_effect = _bulk
+
+        spans = []
+        tracer = CallbackTracer(lambda name, duration, attributes: spans.append((name, attributes)))
+
+        eb = ElasticBuffer(tracer=tracer, stages=[Project(['a'])], _index=lambda doc: 'idx')
+        eb._client = MagicMock()
+        eb._client.bulk.return_value = {'took': 3, 'errors': False, 'items': [{}] * 4}
+
+        eb.add([dict(doc) for doc in self.docs])
+        eb.flush()
+
+        self.assertListEqual([name for name, _ in spans], [
+            'convert_documents',
+            'metadata_funcs',
+            'pipeline',
+            'bulk_request',
+            'bulk',
+            'flush',
+        ])
+        attributes = dict(spans)
+        self.assertEqual(attributes['metadata_funcs']['n_docs'], len(self.docs))
+        self.assertEqual(attributes['bulk_request']['took'], 3)
+        self.assertEqual(attributes['flush']['n_docs'], len(self.docs))
+
     @patch(f'{ElasticBuffer.__module__}.bulk')
     def test_flush_error(self, mock_bulk):
 
@@ -277,6 +829,17 @@ class TestElasticBuffer(unittest.TestCase):
                     {'a': 8, 'b': 9, '_index': 'my-index', '_id': 17},
                 ],
             ),
+            'ingest pipeline metadata func': TestCase(
+                docs_in=[
+                    {'a': 1, 'b': 2},
+                ],
+                metadata_funcs={
+                    'pipeline': lambda doc: 'my-pipeline',
+                },
+                expected_docs=[
+                    {'a': 1, 'b': 2, 'pipeline': 'my-pipeline'},
+                ],
+            ),
         }
 
         for test_name, test in tests.items():
@@ -284,6 +847,21 @@ class TestElasticBuffer(unittest.TestCase):
             docs_out = eb._apply_metadata_funcs(test.docs_in)
             self.assertListEqual(docs_out, test.expected_docs, test_name)
 
+    def test_metadata_cache_info(self):
+
+        @depends_on('a')
+        def _index(doc): return f'index-{doc["a"]}'
+        def _id(doc): return sum(doc.values())
+
+        eb = ElasticBuffer(_index=_index, _id=_id)
+        self.assertListEqual(list(eb.metadata_cache_info), ['_index'])
+
+        docs = eb._apply_metadata_funcs([{'a': 1}, {'a': 1}, {'a': 2}])
+        self.assertListEqual([doc['_index'] for doc in docs], ['index-1', 'index-1', 'index-2'])
+        info = eb.metadata_cache_info['_index']
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 2)
+
     def test__ensure_list_no_pandas(self):
 
         class TestCase:
@@ -380,12 +958,273 @@ class TestElasticBuffer(unittest.TestCase):
                 docs_in=pd.DataFrame(self.docs[0], index=[0]).set_index('c'),
                 expected_docs=[self.docs[0]],
             ),
+            'dataframe with null values': TestCase(
+                docs_in=pd.DataFrame([{'a': 1, 'b': None}, {'a': None, 'b': 'x'}]),
+                expected_docs=[{'a': 1.0}, {'b': 'x'}],
+            ),
         }
 
         for test_name, test in tests.items():
             docs_out = ElasticBuffer._ensure_list(test.docs_in)
             self.assertListEqual(docs_out, test.expected_docs, test_name)
 
+    @unittest.skipIf(pd is None, 'skipping test with pandas data because pandas not found')
+    @patch.object(ElasticBuffer, 'flush')
+    def test_add_columnar(self, mock_flush):
+
+        def _index(doc): return 'my-index'
+
+        class TestCase:
+            def __init__(
+                self,
+                documents,
+                expected_docs,
+                expected_n_frames,
+                expected_flush_called=False,
+                buffer_size=10,
+                bulk_kwargs=None,
+                metadata_funcs=None,
+            ):
+                self.documents = documents
+                self.expected_docs = expected_docs
+                self.expected_n_frames = expected_n_frames
+                self.expected_flush_called = expected_flush_called
+
+                metadata_funcs = {} if metadata_funcs is None else metadata_funcs
+                self.eb = ElasticBuffer(
+                    size=buffer_size,
+                    bulk_kwargs=bulk_kwargs,
+                    columnar=True,
+                    **metadata_funcs,
+                )
+
+        tests = {
+            'empty dataframe': TestCase(
+                documents=[pd.DataFrame()],
+                expected_docs=[],
+                expected_n_frames=0,
+            ),
+            'single dataframe': TestCase(
+                documents=[pd.DataFrame(self.docs)],
+                expected_docs=self.docs,
+                expected_n_frames=1,
+            ),
+            'dataframe with named index': TestCase(
+                documents=[pd.DataFrame(self.docs).set_index('c')],
+                expected_docs=[{'c': doc['c'], 'a': doc['a'], 'b': doc['b']} for doc in self.docs],
+                expected_n_frames=1,
+            ),
+            'dataframe and list of records': TestCase(
+                documents=[pd.DataFrame(self.docs[:2]), self.docs[2:]],
+                expected_docs=self.docs[2:] + self.docs[:2],
+                expected_n_frames=1,
+            ),
+            'multiple dataframes': TestCase(
+                documents=[pd.DataFrame(self.docs[:1]), pd.DataFrame(self.docs[1:])],
+                expected_docs=self.docs,
+                expected_n_frames=2,
+            ),
+            'dataframe larger than chunk size': TestCase(
+                documents=[pd.DataFrame(self.docs)],
+                expected_docs=self.docs,
+                expected_n_frames=1,
+                bulk_kwargs={'chunk_size': len(self.docs) - 1},
+            ),
+            'dataframe with metadata funcs': TestCase(
+                documents=[pd.DataFrame(self.docs)],
+                expected_docs=[{**doc, '_index': 'my-index'} for doc in self.docs],
+                expected_n_frames=1,
+                metadata_funcs={'_index': _index},
+            ),
+            'dataframe exceeding buffer size': TestCase(
+                documents=[pd.DataFrame(self.docs)],
+                expected_docs=[],
+                expected_n_frames=0,
+                expected_flush_called=True,
+                buffer_size=len(self.docs) - 1,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_flush.reset_mock()
+            mock_flush.side_effect = test.eb._clear_buffer
+
+            for documents in test.documents:
+                test.eb.add(documents, timestamp=self.timestamp)
+
+            self.assertEqual(len(test.eb), len(test.expected_docs), test_name)
+            self.assertEqual(len(test.eb._frames), test.expected_n_frames, test_name)
+            self.assertListEqual(list(test.eb._documents()), test.expected_docs, test_name)
+            if test.expected_flush_called:
+                mock_flush.assert_called()
+            else:
+                mock_flush.assert_not_called()
+
+        copy_tests = {
+            'without ids or metadata funcs': ({}, True),
+            'with metadata funcs': ({'_index': lambda doc: 'my-index'}, False),
+            'with id strategy': ({'id_strategy': IdStrategy(fields=['a'])}, False),
+        }
+        for test_name, (kwargs, expected_copy) in copy_tests.items():
+            eb = ElasticBuffer(columnar=True, **kwargs)
+            frame = pd.DataFrame(self.docs)
+            with patch.object(eb, '_add_frame', wraps=eb._add_frame) as mock_add_frame:
+                eb.add(frame)
+            expected_docs = list(eb._documents())
+            frame.loc[0, 'a'] = 999
+            self.assertListEqual(
+                list(eb._documents()),
+                expected_docs,
+                f'{test_name}: changing a DataFrame after adding it should not change buffered '
+                f'documents',
+            )
+            self.assertEqual(mock_add_frame.call_args.kwargs['copy'], expected_copy, test_name)
+
+        calls = []
+
+        @depends_on('a')
+        def _index(doc):
+            calls.append(('_index', doc))
+            return f'index-{doc["a"]}'
+
+        def _id(doc):
+            calls.append(('_id', doc))
+            return doc['c']
+
+        eb = ElasticBuffer(columnar=True, _index=_index, _id=_id)
+        eb.add(pd.DataFrame(self.docs))
+        with patch('builtins.print'):
+            eb.show()
+        self.assertSetEqual(eb._target_indices(), {'index-1', 'index-3', 'index-5', 'index-7'})
+        list(eb._documents())
+
+        self.assertListEqual(
+            calls,
+            [('_index', {'a': doc['a']}) for doc in self.docs]
+            + [('_id', doc) for doc in self.docs],
+            'metadata funcs should be applied once when adding (to dependent fields if cached)',
+        )
+
+    def test_add_id_strategy(self):
+        strategy = IdStrategy(fields=['a'])
+        expected_ids = [strategy({'a': doc['a']}) for doc in self.docs]
+
+        eb = ElasticBuffer(id_strategy=strategy)
+        eb.add([dict(doc) for doc in self.docs])
+        self.assertListEqual([doc['_id'] for doc in eb._buffer], expected_ids)
+
+        eb = ElasticBuffer(id_strategy=strategy, _id=lambda doc: 'from_metadata_func')
+        eb.add([dict(doc) for doc in self.docs])
+        self.assertListEqual(
+            [doc['_id'] for doc in eb._buffer],
+            ['from_metadata_func'] * len(self.docs),
+            'metadata function should take precedence over id strategy',
+        )
+
+        if pd is None:
+            return
+        for columnar in (False, True):
+            eb = ElasticBuffer(id_strategy=strategy, columnar=columnar)
+            eb.add(pd.DataFrame(self.docs))
+            self.assertListEqual(
+                [doc['_id'] for doc in eb._documents()],
+                expected_ids,
+                f'columnar={columnar}',
+            )
+
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_add_op_type(self, mock_bulk):
+
+        class TestCase:
+            def __init__(self, add_calls, expected_actions, op_type='index', columnar=False):
+                self.add_calls = add_calls
+                self.expected_actions = expected_actions
+                self.eb = ElasticBuffer(op_type=op_type, columnar=columnar)
+
+        tests = {
+            'default op type': TestCase(
+                add_calls=[([{'_id': 1, 'a': 1}], {})],
+                expected_actions=[{'_id': 1, 'a': 1}],
+            ),
+            'buffer op type': TestCase(
+                add_calls=[([{'_id': 1, 'a': 1}], {})],
+                expected_actions=[{'_id': 1, '_op_type': 'create', 'a': 1}],
+                op_type='create',
+            ),
+            'add op type overrides buffer op type': TestCase(
+                add_calls=[
+                    ([{'_id': 1, 'a': 1}], {}),
+                    ([{'_id': 2, 'a': 2}], {'op_type': 'upsert'}),
+                ],
+                expected_actions=[
+                    {'_id': 1, '_op_type': 'update', 'doc': {'a': 1}},
+                    {'_id': 2, '_op_type': 'update', 'doc': {'a': 2}, 'doc_as_upsert': True},
+                ],
+                op_type='update',
+            ),
+            'mixed op types': TestCase(
+                add_calls=[
+                    ([{'_id': 1, 'a': 1}], {}),
+                    ([{'_id': 2}], {'op_type': 'delete'}),
+                    ([{'_id': 3, 'a': 3}], {'op_type': 'update'}),
+                ],
+                expected_actions=[
+                    {'_id': 1, 'a': 1},
+                    {'_id': 2, '_op_type': 'delete'},
+                    {'_id': 3, '_op_type': 'update', 'doc': {'a': 3}},
+                ],
+            ),
+        }
+
+        if pd is not None:
+            tests.update({
+                'update from dataframe': TestCase(
+                    add_calls=[(pd.DataFrame([{'_id': 1, 'a': 1}]), {'op_type': 'update'})],
+                    expected_actions=[{'_id': 1, '_op_type': 'update', 'doc': {'a': 1}}],
+                ),
+                'update from columnar dataframe': TestCase(
+                    add_calls=[(pd.DataFrame([{'_id': 1, 'a': 1}]), {'op_type': 'update'})],
+                    expected_actions=[{'_id': 1, '_op_type': 'update', 'doc': {'a': 1}}],
+                    columnar=True,
+                ),
+                'delete from series': TestCase(
+                    add_calls=[(pd.Series(['x', 'y'], name='ignored'), {'op_type': 'delete'})],
+                    expected_actions=[
+                        {'_id': 'x', '_op_type': 'delete'},
+                        {'_id': 'y', '_op_type': 'delete'},
+                    ],
+                ),
+                'delete from columnar series': TestCase(
+                    add_calls=[(pd.Series(['x', 'y']), {'op_type': 'delete'})],
+                    expected_actions=[
+                        {'_id': 'x', '_op_type': 'delete'},
+                        {'_id': 'y', '_op_type': 'delete'},
+                    ],
+                    columnar=True,
+                ),
+            })
+
+        for test_name, test in tests.items():
+            actions = []
+
+            def _bulk(client, docs, **kwargs):
+                actions.extend(docs)
+                return len(actions), []
+
+            mock_bulk.reset_mock()
+            mock_bulk.side_effect = _bulk
+
+            for docs, kwargs in test.add_calls:
+                test.eb.add(docs, **kwargs)
+            test.eb.flush()
+
+            self.assertListEqual(actions, test.expected_actions, test_name)
+
+        with self.assertRaises(ValueError):
+            _ = ElasticBuffer(op_type='invalid')
+        with self.assertRaises(ValueError):
+            ElasticBuffer().add(self.docs, op_type='invalid')
+
     @patch.object(ElasticBuffer, 'flush')
     def test_context_success(self, mock_flush):
 
@@ -464,6 +1303,175 @@ class TestElasticBuffer(unittest.TestCase):
                     raise default_err()  # only raised when eb.add does not result in an Exception
             self.assertEqual(mock_flush.call_count, test.n_expected_flush_calls, test_name)
 
+    @patch.object(ElasticBuffer, '_to_file')
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_context_circuit_open(self, mock_bulk, mock_to_file):
+
+        class TestCase:
+            def __init__(self, breaker_open, dump_dir, expected_err=None, expected_dumped=False):
+                self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+                if breaker_open:
+                    self.breaker.record_failure()
+                self.dump_dir = dump_dir
+                self.expected_err = expected_err
+                self.expected_dumped = expected_dumped
+
+        tests = {
+            'open breaker on exit dumps buffer contents': TestCase(
+                breaker_open=True,
+                dump_dir='/tmp',
+                expected_err=ElasticBufferCircuitOpenError,
+                expected_dumped=True,
+            ),
+            'open breaker on exit without dump_dir': TestCase(
+                breaker_open=True,
+                dump_dir=None,
+                expected_err=ElasticBufferCircuitOpenError,
+            ),
+            'closed breaker on exit flushes buffer contents': TestCase(
+                breaker_open=False,
+                dump_dir='/tmp',
+            ),
+            'other flush error on exit does not dump buffer contents': TestCase(
+                breaker_open=False,
+                dump_dir='/tmp',
+                expected_err=ElasticBufferFlushError,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_bulk.reset_mock()
+            mock_to_file.reset_mock()
+            mock_bulk.return_value = (len(self.docs), [])
+            if test.expected_err is ElasticBufferFlushError:
+                mock_bulk.return_value = (0, [{'index': {'status': 400}}])
+
+            eb = ElasticBuffer(circuit_breaker=test.breaker, dump_dir=test.dump_dir)
+            if test.expected_err is None:
+                with eb:
+                    eb.add(self.docs)
+            else:
+                with self.assertRaises(test.expected_err, msg=test_name):
+                    with eb:
+                        eb.add(self.docs)
+
+            self.assertEqual(mock_to_file.called, test.expected_dumped, test_name)
+            self.assertEqual(len(eb), 0 if test.expected_err is None else len(self.docs), test_name)
+
+    @patch(f'{ElasticBuffer.__module__}.IndexSettingsTuner')
+    @patch(f'{ElasticBuffer.__module__}.bulk')
+    def test_bulk_load(self, mock_bulk, mock_tuner_cls):
+
+        class TestCase:
+            def __init__(self, raise_err, restore_err=None, tune_err=None, expected_err=None):
+                self.raise_err = raise_err
+                self.restore_err = restore_err
+                self.tune_err = tune_err
+                self.expected_err = expected_err
+
+        tests = {
+            'successful load': TestCase(
+                raise_err=None,
+            ),
+            'load raising exception': TestCase(
+                raise_err=ValueError,
+                expected_err=ValueError,
+            ),
+            'restore raising exception': TestCase(
+                raise_err=None,
+                restore_err=ElasticBatchError,
+                expected_err=ElasticBatchError,
+            ),
+            'restore exception does not mask load exception': TestCase(
+                raise_err=ValueError,
+                restore_err=ElasticBatchError,
+                expected_err=ValueError,
+            ),
+            'tune raising elasticsearch exception': TestCase(
+                raise_err=None,
+                tune_err=TransportError(403, 'security_exception'),
+                expected_err=ElasticBufferFlushError,
+            ),
+        }
+
+        docs = [{'_index': 'idx1', 'a': 1}, {'_index': 'idx2', 'a': 2}]
+
+        for test_name, test in tests.items():
+            mock_bulk.reset_mock()
+            mock_bulk.return_value = (len(docs), [])
+            mock_tuner = mock_tuner_cls.return_value
+            mock_tuner.reset_mock()
+            mock_tuner.restore.side_effect = test.restore_err
+            mock_tuner.tune.side_effect = test.tune_err
+
+            eb = ElasticBuffer()
+            try:
+                with eb.bulk_load(force_merge=True):
+                    eb.add(docs)
+                    if test.raise_err:
+                        raise test.raise_err()
+            except Exception as err:
+                self.assertIsInstance(err, test.expected_err, test_name)
+            else:
+                self.assertIsNone(test.expected_err, test_name)
+
+            if test.raise_err:
+                mock_tuner.tune.assert_not_called()
+            else:
+                mock_tuner.tune.assert_called_once_with({'idx1', 'idx2'})
+            expected_bulk_called = test.raise_err is None and test.tune_err is None
+            self.assertEqual(mock_bulk.called, expected_bulk_called, test_name)
+            mock_tuner.restore.assert_called_once_with(refresh=True, force_merge=True)
+            self.assertIsNone(eb._index_tuner, test_name)
+
+    def test__target_indices(self):
+
+        class TestCase:
+            def __init__(self, documents, expected_indices, bulk_kwargs=None, metadata_funcs=None):
+                self.documents = documents
+                self.expected_indices = expected_indices
+                metadata_funcs = {} if metadata_funcs is None else metadata_funcs
+                self.eb = ElasticBuffer(bulk_kwargs=bulk_kwargs, columnar=True, **metadata_funcs)
+
+        tests = {
+            'empty buffer': TestCase(
+                documents=[],
+                expected_indices=set(),
+            ),
+            'documents without index': TestCase(
+                documents=[self.docs],
+                expected_indices=set(),
+            ),
+            'documents with and without index and default index': TestCase(
+                documents=[[{'_index': 'idx1'}, {'a': 1}]],
+                expected_indices={'idx1', 'default'},
+                bulk_kwargs={'index': 'default'},
+            ),
+            'index from metadata func': TestCase(
+                documents=[[dict(doc) for doc in self.docs]],
+                expected_indices={'idx-1', 'idx-3', 'idx-5', 'idx-7'},
+                metadata_funcs={'_index': lambda doc: f'idx-{doc["a"]}'},
+            ),
+        }
+
+        if pd is not None:
+            tests.update({
+                'dataframe with index column': TestCase(
+                    documents=[pd.DataFrame([{'_index': 'idx1'}, {'_index': 'idx2'}])],
+                    expected_indices={'idx1', 'idx2'},
+                ),
+                'dataframe with index metadata func': TestCase(
+                    documents=[pd.DataFrame(self.docs)],
+                    expected_indices={'idx-1', 'idx-3', 'idx-5', 'idx-7'},
+                    metadata_funcs={'_index': lambda doc: f'idx-{doc["a"]}'},
+                ),
+            })
+
+        for test_name, test in tests.items():
+            for documents in test.documents:
+                test.eb.add(documents)
+            self.assertSetEqual(test.eb._target_indices(), test.expected_indices, test_name)
+
     @patch(f'{ElasticBuffer.__module__}.open', side_effect=mock_open())
     def test__to_file(self, mocked_file):
         dump_dir = '/tmp'
@@ -494,6 +1502,27 @@ class TestElasticBuffer(unittest.TestCase):
             'write should be called with each document (json serialized and newline)'
         )
 
+        mocked_file().write.reset_mock()
+        stage = MagicMock(side_effect=RuntimeError('stage failed'))
+        eb = ElasticBuffer(dump_dir=dump_dir, stages=[stage])
+        eb.add(self.docs)
+        eb._to_file(timestamp=self.timestamp)
+        stage.assert_not_called()
+        write_call_args = [arg[0][0] for arg in mocked_file().write.call_args_list]
+        self.assertListEqual(
+            write_call_args,
+            expected_write_call_args,
+            'buffered documents should be written without applying the pipeline',
+        )
+
+        mocked_file.reset_mock()
+        eb = ElasticBuffer(dump_dir=dump_dir, lanes={'alerts': {'size': 10}})
+        eb.lanes['alerts']._to_file(timestamp=self.timestamp)
+        mocked_file.assert_called_once_with(
+            os.path.join(dump_dir, f'{eb.__class__.__name__}_buffer_dump_alerts_{self.timestamp}'),
+            'w',
+        )
+
     def test__get_oldest_elapsed_time_from(self):
 
         class TestCase:
@@ -567,6 +1596,8 @@ class TestElasticBuffer(unittest.TestCase):
             test.eb._clear_buffer()
             self.assertListEqual(test.eb._buffer, [], test_name)
             self.assertIsNone(test.eb._oldest_doc_timestamp, test_name)
+            self.assertEqual(len(test.eb._insert_timestamps), 0, test_name)
+            self.assertEqual(len(test.eb._insert_counts), 0, test_name)
 
     def test_len(self):
 
@@ -0,0 +1,67 @@
+import unittest
+
+from elasticbatch.checkpoint import OffsetTracker
+
+
+class TestOffsetTracker(unittest.TestCase):
+
+    def test_complete(self):
+
+        class TestCase:
+            def __init__(self, registered, completions, expected_committed):
+                self.registered = registered
+                self.completions = completions
+                self.expected_committed = expected_committed
+
+        tests = {
+            'in order': TestCase(
+                registered=[('p0', 1), ('p0', 2), ('p0', 3)],
+                completions=[[0], [1, 2]],
+                expected_committed=[{'p0': 1}, {'p0': 3}],
+            ),
+            'out of order': TestCase(
+                registered=[('p0', 1), ('p0', 2), ('p0', 3)],
+                completions=[[1], [2], [0]],
+                expected_committed=[{}, {}, {'p0': 3}],
+            ),
+            'multiple partitions': TestCase(
+                registered=[('p0', 1), ('p1', 10), ('p0', 2), ('p1', 11)],
+                completions=[[1, 2], [0, 3]],
+                expected_committed=[{'p1': 10}, {'p0': 2, 'p1': 11}],
+            ),
+            'opaque offsets committed in registration order': TestCase(
+                registered=[('p0', 'b'), ('p0', 'a')],
+                completions=[[0, 1]],
+                expected_committed=[{'p0': 'a'}],
+            ),
+            'completed twice': TestCase(
+                registered=[('p0', 1)],
+                completions=[[0], [0]],
+                expected_committed=[{'p0': 1}, {}],
+            ),
+        }
+
+        for test_name, test in tests.items():
+            tracker = OffsetTracker()
+            positions = [tracker.register(*position) for position in test.registered]
+
+            committed = [
+                tracker.complete([positions[i] for i in completion])
+                for completion in test.completions
+            ]
+
+            self.assertListEqual(committed, test.expected_committed, test_name)
+            self.assertEqual(len(tracker), 0, test_name)
+            expected = {}
+            for partition_committed in test.expected_committed:
+                expected.update(partition_committed)
+            self.assertDictEqual(tracker.committed, expected, test_name)
+
+    def test_len(self):
+        tracker = OffsetTracker()
+        first = tracker.register('p0', 1)
+        tracker.register('p0', 2)
+        tracker.register('p1', 1)
+        self.assertEqual(len(tracker), 3)
+        tracker.complete([first])
+        self.assertEqual(len(tracker), 2)
@@ -0,0 +1,105 @@
+import unittest
+
+from elasticbatch.frames import frame_to_records, validate_datetime_format, validate_null_values
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+@unittest.skipIf(pd is None, 'skipping test with pandas data because pandas not found')
+class TestFrameToRecords(unittest.TestCase):
+
+    def test_frame_to_records(self):
+
+        class TestCase:
+            def __init__(self, frame, expected_docs, null_values='drop', datetime_format='iso'):
+                self.frame = frame
+                self.expected_docs = expected_docs
+                self.null_values = null_values
+                self.datetime_format = datetime_format
+
+        nulls = pd.DataFrame({
+            'a': [1.5, None],
+            'b': ['x', None],
+            'c': pd.array([None, 2], dtype='Int64'),
+        })
+
+        datetimes = pd.DataFrame({
+            'naive': [pd.Timestamp('2020-01-02 03:04:05.5'), pd.NaT],
+            'aware': [pd.Timestamp('2020-01-02 03:04:05', tz='US/Eastern'), pd.NaT],
+        })
+
+        tests = {
+            'no columns': TestCase(
+                frame=pd.DataFrame(index=[0, 1]),
+                expected_docs=[{}, {}],
+            ),
+            'numpy types converted to native types': TestCase(
+                frame=pd.DataFrame({
+                    'i': np.array([1], dtype='int32'),
+                    'f': np.array([0.5], dtype='float32'),
+                    'b': np.array([True]),
+                }),
+                expected_docs=[{'i': 1, 'f': 0.5, 'b': True}],
+            ),
+            'drop null values': TestCase(
+                frame=nulls,
+                expected_docs=[{'a': 1.5, 'b': 'x'}, {'c': 2}],
+            ),
+            'null values set to None': TestCase(
+                frame=nulls,
+                expected_docs=[{'a': 1.5, 'b': 'x', 'c': None}, {'a': None, 'b': None, 'c': 2}],
+                null_values='null',
+            ),
+            'iso datetimes': TestCase(
+                frame=datetimes,
+                expected_docs=[
+                    {'naive': '2020-01-02T03:04:05.500000', 'aware': '2020-01-02T08:04:05.000000Z'},
+                    {},
+                ],
+            ),
+            'epoch millis datetimes': TestCase(
+                frame=datetimes,
+                expected_docs=[{'naive': 1577934245500, 'aware': 1577952245000}, {}],
+                datetime_format='epoch_millis',
+            ),
+            'kept datetimes': TestCase(
+                frame=datetimes,
+                expected_docs=[
+                    {
+                        'naive': pd.Timestamp('2020-01-02 03:04:05.5'),
+                        'aware': pd.Timestamp('2020-01-02 03:04:05', tz='US/Eastern'),
+                    },
+                    {'naive': None, 'aware': None},
+                ],
+                null_values='null',
+                datetime_format='keep',
+            ),
+        }
+
+        for test_name, test in tests.items():
+            docs = frame_to_records(test.frame, test.null_values, test.datetime_format)
+            self.assertListEqual(docs, test.expected_docs, test_name)
+            for doc in docs:
+                for val in doc.values():
+                    self.assertNotIsInstance(val, np.generic, test_name)
+
+    def test_frame_to_records_keep_null_values(self):
+        docs = frame_to_records(pd.DataFrame({'a': [None, 1.0]}), null_values='keep')
+        self.assertEqual(len(docs), 2)
+        self.assertTrue(np.isnan(docs[0]['a']))
+        self.assertEqual(docs[1]['a'], 1.0)
+
+
+class TestValidate(unittest.TestCase):
+
+    def test_validate(self):
+        self.assertEqual(validate_null_values('null'), 'null')
+        self.assertEqual(validate_datetime_format('epoch_millis'), 'epoch_millis')
+        with self.assertRaises(ValueError):
+            _ = validate_null_values('nan')
+        with self.assertRaises(ValueError):
+            _ = validate_datetime_format('epoch')
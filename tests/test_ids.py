@@ -0,0 +1,194 @@
+import hashlib
+import struct
+import time
+import unittest
+
+from elasticbatch.frames import frame_to_records
+from elasticbatch.ids import IdStrategy
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+def _blake2b(key):
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def _float_str(value):
+    return hex(struct.unpack('<Q', struct.pack('<d', value))[0])
+
+
+class TestIdStrategy(unittest.TestCase):
+
+    def test_init(self):
+        with self.assertRaises(ValueError):
+            IdStrategy(fields=[])
+        with self.assertRaises(ValueError):
+            IdStrategy(algorithm='md5')
+
+    def test_call(self):
+
+        class TestCase:
+            def __init__(self, strategy, doc, expected_key=None, expected_err=None):
+                self.strategy = strategy
+                self.doc = doc
+                self.expected_key = expected_key
+                self.expected_err = expected_err
+
+        tests = {
+            'content of all non-metadata fields in sorted order': TestCase(
+                strategy=IdStrategy(),
+                doc={'b': 'x', 'a': 1, '_index': 'idx'},
+                expected_key='a=1\x1fb=x',
+            ),
+            'key fields in given order': TestCase(
+                strategy=IdStrategy(fields=['b', 'a']),
+                doc={'a': 1, 'b': 'x', 'c': 2.5},
+                expected_key='b=x\x1fa=1',
+            ),
+            'null value': TestCase(
+                strategy=IdStrategy(fields=['a', 'b']),
+                doc={'a': 1, 'b': None},
+                expected_key='a=1\x1fb=',
+            ),
+            'missing key field treated as null': TestCase(
+                strategy=IdStrategy(fields=['a', 'b']),
+                doc={'a': 1},
+                expected_key='a=1\x1fb=',
+            ),
+            'float value represented by its bits': TestCase(
+                strategy=IdStrategy(fields=['a', 'b']),
+                doc={'a': 1.5, 'b': True},
+                expected_key=f'a={_float_str(1.5)}\x1fb=True',
+            ),
+        }
+
+        for test_name, test in tests.items():
+            if test.expected_err:
+                with self.assertRaises(test.expected_err, msg=test_name):
+                    test.strategy(test.doc)
+                continue
+            self.assertEqual(test.strategy(test.doc), _blake2b(test.expected_key), test_name)
+
+    def test_assign(self):
+        docs = [{'a': 1}, {'a': 1, '_id': 'existing'}, {'a': 2}]
+
+        result = IdStrategy().assign(docs)
+
+        self.assertListEqual([doc['_id'] for doc in result], [
+            _blake2b('a=1'),
+            'existing',
+            _blake2b('a=2'),
+        ])
+
+    @unittest.skipIf(xxhash is None, 'skipping test of xxh3 algorithm because xxhash not found')
+    def test_call_xxh3(self):
+        strategy = IdStrategy(fields=['a'], algorithm='xxh3')
+        self.assertEqual(strategy({'a': 1}), xxhash.xxh3_128_hexdigest(b'a=1'))
+
+
+@unittest.skipIf(pd is None, 'skipping test with pandas data because pandas not found')
+class TestIdStrategyFrame(unittest.TestCase):
+
+    def test_assign_frame(self):
+
+        class TestCase:
+            def __init__(self, strategy, frame, expected_ids=None, expected_err=None):
+                self.strategy = strategy
+                self.frame = frame
+                self.expected_ids = expected_ids
+                self.expected_err = expected_err
+
+        tests = {
+            'content of all non-metadata columns': TestCase(
+                strategy=IdStrategy(),
+                frame=pd.DataFrame({'b': ['x', 'y'], 'a': [1, 2], '_index': ['idx', 'idx']}),
+                expected_ids=[_blake2b('a=1\x1fb=x'), _blake2b('a=2\x1fb=y')],
+            ),
+            'key columns with null value': TestCase(
+                strategy=IdStrategy(fields=['b']),
+                frame=pd.DataFrame({'a': [1, 2], 'b': ['x', None]}),
+                expected_ids=[_blake2b('b=x'), _blake2b('b=')],
+            ),
+            'existing ids kept': TestCase(
+                strategy=IdStrategy(fields=['a']),
+                frame=pd.DataFrame({'a': [1, 2], '_id': ['existing', None]}),
+                expected_ids=['existing', _blake2b('a=2')],
+            ),
+            'missing key column': TestCase(
+                strategy=IdStrategy(fields=['c']),
+                frame=pd.DataFrame({'a': [1, 2]}),
+                expected_err=ValueError,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            if test.expected_err:
+                with self.assertRaises(test.expected_err, msg=test_name):
+                    test.strategy.assign_frame(test.frame)
+                continue
+
+            frame = test.frame.copy()
+            result = test.strategy.assign_frame(test.frame)
+
+            self.assertListEqual(result['_id'].tolist(), test.expected_ids, test_name)
+            pd.testing.assert_frame_equal(test.frame, frame)  # input should not be modified
+
+    def test_assign_frame_matches_assign(self):
+        frame = pd.DataFrame({
+            'a': [1, 3],
+            'b': ['x', None],
+            'c': [1.5, float('nan')],
+            'd': pd.to_datetime(['2020-01-01 12:30:00', None]),
+            'e': pd.to_datetime(['2020-01-01', '2020-06-01']).tz_localize('US/Eastern'),
+            'f': pd.array([0.1, 0.2], dtype='float32'),
+            'g': pd.array([None, 2], dtype='Int64'),
+            'h': [True, False],
+            'i': pd.Series(['x', 1.5], dtype=object),
+            'j': [-0.0, float('inf')],
+            'k': pd.array([0.5, None], dtype='Float64'),
+            '_index': ['idx', 'idx'],
+        })
+
+        for fields in (None, ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k']):
+            for null_values in ('drop', 'null', 'keep'):
+                for datetime_format in ('iso', 'epoch_millis', 'keep'):
+                    test_name = f'fields={fields}, {null_values}, {datetime_format}'
+                    strategy = IdStrategy(fields=fields)
+                    docs = frame_to_records(frame, null_values, datetime_format)
+
+                    frame_ids = strategy.assign_frame(frame, null_values, datetime_format)['_id']
+
+                    self.assertListEqual(
+                        frame_ids.tolist(),
+                        [doc['_id'] for doc in strategy.assign(docs)],
+                        test_name,
+                    )
+
+    def test_assign_frame_faster_than_assign(self):
+        n_rows = 20000
+        frame = pd.DataFrame({f'c{i}': [row / (i + 1) for row in range(n_rows)] for i in range(10)})
+        docs = frame_to_records(frame)
+        strategy = IdStrategy()
+
+        frame_times = []
+        docs_times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            strategy.assign_frame(frame)
+            frame_times.append(time.perf_counter() - start)
+
+            docs_copy = [dict(doc) for doc in docs]  # assign sets _id of the documents
+            start = time.perf_counter()
+            strategy.assign(docs_copy)
+            docs_times.append(time.perf_counter() - start)
+
+        # keys are formed column-wise, so only joining and hashing keys should be done per row
+        self.assertLess(min(frame_times), min(docs_times))
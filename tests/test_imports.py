@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = ('elasticsearch', 'pandas')
+
+
+def _loaded_modules(statement):
+    loaded = f'",".join(m for m in {HEAVY_MODULES} if m in sys.modules)'
+    check = f'import sys; {statement}; print({loaded})'
+    out = subprocess.run([sys.executable, '-c', check], check=True, stdout=subprocess.PIPE)
+    return [mod for mod in out.stdout.decode().strip().split(',') if mod]
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_lazy_imports(self):
+
+        class TestCase:
+            def __init__(self, statement, expected_modules):
+                self.statement = statement
+                self.expected_modules = expected_modules
+
+        tests = {
+            'import package': TestCase(
+                statement='import elasticbatch',
+                expected_modules=[],
+            ),
+            'import all modules': TestCase(
+                statement='import elasticbatch.buffer, elasticbatch.exceptions, elasticbatch.types',
+                expected_modules=[],
+            ),
+            'check for pandas': TestCase(
+                statement='from elasticbatch.types import no_pandas',
+                expected_modules=[],
+            ),
+            'create buffer and add dicts': TestCase(
+                statement='import elasticbatch; elasticbatch.ElasticBuffer().add([{"a": 1}])',
+                expected_modules=['elasticsearch'],
+            ),
+        }
+
+        for test_name, test in tests.items():
+            self.assertListEqual(_loaded_modules(test.statement), test.expected_modules, test_name)
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import MagicMock
+
+from elasticsearch import NotFoundError, TransportError
+
+from elasticbatch.exceptions import ElasticBatchError
+from elasticbatch.indices import IndexSettingsTuner
+
+
+class TestIndexSettingsTuner(unittest.TestCase):
+
+    settings = {
+        'index.refresh_interval': '-1',
+        'index.number_of_replicas': 0,
+    }
+
+    @staticmethod
+    def _client(existing):
+        """
+        Return mock client with existing indices given as dict of index name to flat settings
+        """
+        def get_settings(index, **kwargs):
+            if index not in existing:
+                raise NotFoundError(404, 'index_not_found_exception')
+            return {index: {'settings': existing[index]}}
+
+        client = MagicMock()
+        client.indices.get_settings.side_effect = get_settings
+        return client
+
+    def test_tune(self):
+        client = self._client({
+            'idx1': {'index.refresh_interval': '30s'},
+            'idx2': {},
+        })
+        tuner = IndexSettingsTuner(client, self.settings)
+
+        tuner.tune(['idx1', 'missing'])
+        tuner.tune(['idx1', 'idx2'])
+
+        put_calls = [kwargs for _, kwargs in client.indices.put_settings.call_args_list]
+        self.assertListEqual(put_calls, [
+            {'index': 'idx1', 'body': self.settings},
+            {'index': 'idx2', 'body': self.settings},
+        ], 'settings should be applied once to each existing index')
+        self.assertListEqual(sorted(tuner.tuned_indices), ['idx1', 'idx2'])
+
+    def test_tune_error(self):
+        client = self._client({'idx1': {'index.refresh_interval': '30s'}})
+        client.indices.put_settings.side_effect = TransportError(403, 'security_exception')
+        tuner = IndexSettingsTuner(client, self.settings)
+
+        with self.assertRaises(TransportError):
+            tuner.tune(['idx1'])
+        self.assertListEqual(tuner.tuned_indices, [], 'index should not be restored if not tuned')
+
+        client.indices.put_settings.side_effect = None
+        tuner.tune(['idx1'])
+        self.assertListEqual(tuner.tuned_indices, ['idx1'], 'tuning should be retried')
+
+    def test_restore(self):
+
+        class TestCase:
+            def __init__(self, refresh, force_merge):
+                self.refresh = refresh
+                self.force_merge = force_merge
+
+        tests = {
+            'restore only': TestCase(refresh=False, force_merge=False),
+            'restore and refresh': TestCase(refresh=True, force_merge=False),
+            'restore, refresh and force merge': TestCase(refresh=True, force_merge=True),
+        }
+
+        for test_name, test in tests.items():
+            client = self._client({'idx1': {'index.refresh_interval': '30s'}})
+            tuner = IndexSettingsTuner(client, self.settings)
+            tuner.tune(['idx1'])
+            client.reset_mock()
+
+            tuner.restore(refresh=test.refresh, force_merge=test.force_merge)
+
+            client.indices.put_settings.assert_called_once_with(
+                index='idx1',
+                body={'index.refresh_interval': '30s', 'index.number_of_replicas': None},
+            )
+            self.assertEqual(client.indices.refresh.called, test.refresh, test_name)
+            self.assertEqual(client.indices.forcemerge.called, test.force_merge, test_name)
+            self.assertListEqual(tuner.tuned_indices, [], test_name)
+
+    def test_restore_error(self):
+        client = self._client({'idx1': {}, 'idx2': {}})
+        tuner = IndexSettingsTuner(client, self.settings)
+        tuner.tune(['idx1', 'idx2'])
+
+        def put_settings(index, body):
+            if index == 'idx1':
+                raise TransportError(500, 'error')
+
+        client.indices.put_settings.side_effect = put_settings
+        with self.assertRaises(ElasticBatchError):
+            tuner.restore()
+
+        self.assertListEqual(tuner.tuned_indices, ['idx1'], 'failed index should remain tuned')
+        client.indices.refresh.assert_called_once_with(index='idx2')
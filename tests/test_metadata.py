@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock
+
+from elasticbatch.metadata import CachedMetadataFunc, depends_on
+
+
+class TestCachedMetadataFunc(unittest.TestCase):
+
+    def test_call(self):
+
+        class TestCase:
+            def __init__(self, fields, docs, expected_results, expected_n_calls, maxsize=1024):
+                self.func = MagicMock(side_effect=lambda doc: '-'.join(map(str, doc.values())))
+                self.cached = CachedMetadataFunc(self.func, fields, maxsize=maxsize)
+                self.docs = docs
+                self.expected_results = expected_results
+                self.expected_n_calls = expected_n_calls
+
+        tests = {
+            'single field with repeated values': TestCase(
+                fields=['date'],
+                docs=[{'date': 'd1', 'a': 1}, {'date': 'd1', 'a': 2}, {'date': 'd2', 'a': 3}],
+                expected_results=['d1', 'd1', 'd2'],
+                expected_n_calls=2,
+            ),
+            'multiple fields': TestCase(
+                fields=['date', 'a'],
+                docs=[{'date': 'd1', 'a': 1}, {'date': 'd1', 'a': 2}, {'date': 'd1', 'a': 1}],
+                expected_results=['d1-1', 'd1-2', 'd1-1'],
+                expected_n_calls=2,
+            ),
+            'missing field': TestCase(
+                fields=['date'],
+                docs=[{'a': 1}, {'a': 2}],
+                expected_results=['None', 'None'],
+                expected_n_calls=1,
+            ),
+            'unhashable field value': TestCase(
+                fields=['date'],
+                docs=[{'date': ['d1']}, {'date': ['d1']}],
+                expected_results=["['d1']", "['d1']"],
+                expected_n_calls=2,
+            ),
+            'bounded cache': TestCase(
+                fields=['date'],
+                docs=[{'date': 'd1'}, {'date': 'd2'}, {'date': 'd1'}],
+                expected_results=['d1', 'd2', 'd1'],
+                expected_n_calls=3,
+                maxsize=1,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            results = [test.cached(doc) for doc in test.docs]
+            self.assertListEqual(results, test.expected_results, test_name)
+            self.assertEqual(test.func.call_count, test.expected_n_calls, test_name)
+
+    def test_cache_info(self):
+        cached = CachedMetadataFunc(lambda doc: doc['a'], ['a'])
+        for doc in [{'a': 1}, {'a': 1}, {'a': 2}]:
+            cached(doc)
+
+        info = cached.cache_info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 2)
+
+        cached.cache_clear()
+        self.assertEqual(cached.cache_info().currsize, 0)
+
+    def test_depends_on(self):
+
+        @depends_on('a', maxsize=10)
+        def _index(doc):
+            """index from a"""
+            return f'index-{doc["a"]}'
+
+        self.assertIsInstance(_index, CachedMetadataFunc)
+        self.assertTupleEqual(_index.fields, ('a',))
+        self.assertEqual(_index.__name__, '_index')
+        self.assertEqual(_index.__doc__, 'index from a')
+        self.assertEqual(_index({'a': 1, 'b': 2}), 'index-1')
+        self.assertEqual(_index.cache_info().maxsize, 10)
+
+        with self.assertRaises(ValueError):
+            _ = depends_on()(lambda doc: 1)
@@ -0,0 +1,116 @@
+import unittest
+
+from elasticbatch import ops
+
+
+class TestOps(unittest.TestCase):
+
+    def test_validate_op_type(self):
+        for op_type in ops.OP_TYPES:
+            self.assertEqual(ops.validate_op_type(op_type), op_type)
+        for op_type in ['upsertt', 'INDEX', None]:
+            with self.assertRaises(ValueError, msg=op_type):
+                _ = ops.validate_op_type(op_type)
+
+    def test_set_op_type(self):
+
+        class TestCase:
+            def __init__(self, docs_in, op_type, expected_docs):
+                self.docs_in = docs_in
+                self.op_type = op_type
+                self.expected_docs = expected_docs
+
+        tests = {
+            'index does not set op type': TestCase(
+                docs_in=[{'a': 1}, {'a': 2, '_op_type': 'delete'}],
+                op_type=ops.INDEX,
+                expected_docs=[{'a': 1}, {'a': 2, '_op_type': 'delete'}],
+            ),
+            'update': TestCase(
+                docs_in=[{'a': 1}, {'a': 2}],
+                op_type=ops.UPDATE,
+                expected_docs=[{'a': 1, '_op_type': 'update'}, {'a': 2, '_op_type': 'update'}],
+            ),
+            'delete overrides existing op type': TestCase(
+                docs_in=[{'_id': 1, '_op_type': 'index'}],
+                op_type=ops.DELETE,
+                expected_docs=[{'_id': 1, '_op_type': 'delete'}],
+            ),
+        }
+
+        for test_name, test in tests.items():
+            docs_out = ops.set_op_type(test.docs_in, test.op_type)
+            self.assertListEqual(docs_out, test.expected_docs, test_name)
+
+    def test_to_action(self):
+
+        class TestCase:
+            def __init__(self, doc, expected_action):
+                self.doc = doc
+                self.expected_action = expected_action
+
+        tests = {
+            'no op type': TestCase(
+                doc={'_index': 'idx', 'a': 1},
+                expected_action={'_index': 'idx', 'a': 1},
+            ),
+            'index': TestCase(
+                doc={'_index': 'idx', '_op_type': 'index', 'a': 1},
+                expected_action={'_index': 'idx', '_op_type': 'index', 'a': 1},
+            ),
+            'create': TestCase(
+                doc={'_index': 'idx', '_op_type': 'create', 'a': 1},
+                expected_action={'_index': 'idx', '_op_type': 'create', 'a': 1},
+            ),
+            'delete': TestCase(
+                doc={'_index': 'idx', '_id': 3, '_op_type': 'delete'},
+                expected_action={'_index': 'idx', '_id': 3, '_op_type': 'delete'},
+            ),
+            'update': TestCase(
+                doc={'_index': 'idx', '_id': 3, '_op_type': 'update', 'a': 1, 'b': 2},
+                expected_action={
+                    '_index': 'idx',
+                    '_id': 3,
+                    '_op_type': 'update',
+                    'doc': {'a': 1, 'b': 2},
+                },
+            ),
+            'upsert': TestCase(
+                doc={'_index': 'idx', '_id': 3, '_op_type': 'upsert', 'a': 1, 'routing': 'r'},
+                expected_action={
+                    '_index': 'idx',
+                    '_id': 3,
+                    '_op_type': 'update',
+                    'routing': 'r',
+                    'doc': {'a': 1},
+                    'doc_as_upsert': True,
+                },
+            ),
+            'update with doc body': TestCase(
+                doc={'_id': 3, '_op_type': 'update', 'doc': {'a': 1}},
+                expected_action={'_id': 3, '_op_type': 'update', 'doc': {'a': 1}},
+            ),
+            'update with script body': TestCase(
+                doc={'_id': 3, '_op_type': 'update', 'script': {'source': 'ctx._source.a++'}},
+                expected_action={
+                    '_id': 3,
+                    '_op_type': 'update',
+                    'script': {'source': 'ctx._source.a++'},
+                },
+            ),
+            'upsert with doc body': TestCase(
+                doc={'_id': 3, '_op_type': 'upsert', 'doc': {'a': 1}},
+                expected_action={
+                    '_id': 3,
+                    '_op_type': 'update',
+                    'doc': {'a': 1},
+                    'doc_as_upsert': True,
+                },
+            ),
+        }
+
+        for test_name, test in tests.items():
+            doc = dict(test.doc)
+            action = ops.to_action(test.doc)
+            self.assertDictEqual(action, test.expected_action, test_name)
+            self.assertDictEqual(test.doc, doc, f'{test_name}: document should not be modified')
@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import MagicMock
+
+from elasticbatch.pipeline import Coerce, DropNulls, Enrich, Filter, Project, run_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+
+    docs = [
+        {'_index': 'idx', 'a': 1, 'b': None, 'c': '3'},
+        {'_index': 'idx', 'a': 2, 'b': float('nan'), 'c': '4'},
+        {'_index': 'idx', 'a': 1, 'b': 2.5},
+    ]
+
+    def test_stages(self):
+
+        class TestCase:
+            def __init__(self, stage, expected_docs):
+                self.stage = stage
+                self.expected_docs = expected_docs
+
+        tests = {
+            'project': TestCase(
+                stage=Project(['a']),
+                expected_docs=[
+                    {'_index': 'idx', 'a': 1},
+                    {'_index': 'idx', 'a': 2},
+                    {'_index': 'idx', 'a': 1},
+                ],
+            ),
+            'project without metadata': TestCase(
+                stage=Project(['a', 'c'], keep_metadata=False),
+                expected_docs=[{'a': 1, 'c': '3'}, {'a': 2, 'c': '4'}, {'a': 1}],
+            ),
+            'drop nulls': TestCase(
+                stage=DropNulls(),
+                expected_docs=[
+                    {'_index': 'idx', 'a': 1, 'c': '3'},
+                    {'_index': 'idx', 'a': 2, 'c': '4'},
+                    {'_index': 'idx', 'a': 1, 'b': 2.5},
+                ],
+            ),
+            'drop nulls from fields': TestCase(
+                stage=DropNulls(fields=['c']),
+                expected_docs=self.docs,
+            ),
+            'filter': TestCase(
+                stage=Filter(lambda doc: doc['a'] == 1),
+                expected_docs=[self.docs[0], self.docs[2]],
+            ),
+            'coerce': TestCase(
+                stage=Coerce(a=str, b=int, c=int),
+                expected_docs=[
+                    {'_index': 'idx', 'a': '1', 'b': None, 'c': 3},
+                    {'_index': 'idx', 'a': '2', 'b': self.docs[1]['b'], 'c': 4},
+                    {'_index': 'idx', 'a': '1', 'b': 2},
+                ],
+            ),
+            'enrich': TestCase(
+                stage=Enrich(['a'], lambda key: {'d': key * 10} if key == 1 else None),
+                expected_docs=[
+                    {**self.docs[0], 'd': 10},
+                    self.docs[1],
+                    {**self.docs[2], 'd': 10},
+                ],
+            ),
+            'enrich with multiple key fields': TestCase(
+                stage=Enrich(['_index', 'a'], lambda key: {'d': '-'.join(map(str, key))}),
+                expected_docs=[
+                    {**self.docs[0], 'd': 'idx-1'},
+                    {**self.docs[1], 'd': 'idx-2'},
+                    {**self.docs[2], 'd': 'idx-1'},
+                ],
+            ),
+        }
+
+        for test_name, test in tests.items():
+            docs_in = [dict(doc) for doc in self.docs]
+            docs_out = test.stage(docs_in)
+            self.assertListEqual(
+                [str(doc) for doc in docs_out],
+                [str(doc) for doc in test.expected_docs],
+                test_name,
+            )
+            self.assertListEqual(
+                [str(doc) for doc in docs_in],
+                [str(doc) for doc in self.docs],
+                f'{test_name}: input documents should not be modified',
+            )
+
+    def test_enrich_cache(self):
+        lookup = MagicMock(return_value={'d': 1})
+        stage = Enrich(['a'], lookup, maxsize=1)
+
+        stage([{'a': 1}, {'a': 1}, {'a': 2}, {'a': 1}, {'a': [1]}])
+
+        self.assertEqual(lookup.call_count, 4, 'lookup should be called on each cache miss')
+        info = stage.cache_info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 3)
+
+        with self.assertRaises(ValueError):
+            _ = Enrich([], lookup)
+
+    def test_run_pipeline(self):
+        stages = [Filter(lambda doc: doc['a'] == 1), Project(['b'], keep_metadata=False)]
+        self.assertListEqual(run_pipeline(stages, self.docs), [{'b': None}, {'b': 2.5}])
+        self.assertListEqual(run_pipeline([], self.docs), self.docs)
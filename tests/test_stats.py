@@ -0,0 +1,57 @@
+import unittest
+
+from elasticbatch.stats import weighted_percentiles
+
+
+class TestWeightedPercentiles(unittest.TestCase):
+
+    def test_weighted_percentiles(self):
+
+        class TestCase:
+            def __init__(self, values, weights, percentiles, expected):
+                self.values = values
+                self.weights = weights
+                self.percentiles = percentiles
+                self.expected = expected
+
+        tests = {
+            'no values': TestCase(
+                values=[],
+                weights=[],
+                percentiles=[50],
+                expected={},
+            ),
+            'zero weights': TestCase(
+                values=[1.0, 2.0],
+                weights=[0, 0],
+                percentiles=[50],
+                expected={},
+            ),
+            'single value': TestCase(
+                values=[3.5],
+                weights=[10],
+                percentiles=[0, 50, 99, 100],
+                expected={0: 3.5, 50: 3.5, 99: 3.5, 100: 3.5},
+            ),
+            'unit weights': TestCase(
+                values=[4.0, 1.0, 3.0, 2.0],
+                weights=[1, 1, 1, 1],
+                percentiles=[25, 50, 75, 100],
+                expected={25: 1.0, 50: 2.0, 75: 3.0, 100: 4.0},
+            ),
+            'unequal weights': TestCase(
+                values=[10.0, 1.0],
+                weights=[1, 99],
+                percentiles=[50, 99, 100],
+                expected={50: 1.0, 99: 1.0, 100: 10.0},
+            ),
+        }
+
+        for test_name, test in tests.items():
+            result = weighted_percentiles(test.values, test.weights, test.percentiles)
+            self.assertDictEqual(result, test.expected, test_name)
+
+    def test_weighted_percentiles_invalid_percentile(self):
+        for pct in [-1, 101]:
+            with self.assertRaises(ValueError, msg=pct):
+                _ = weighted_percentiles([1.0], [1], [pct])
@@ -0,0 +1,225 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from elasticsearch import ConnectionError as ESConnectionError
+from elasticsearch import TransportError
+from elasticsearch.serializer import JSONSerializer
+
+from elasticbatch.breaker import CircuitBreaker
+from elasticbatch.exceptions import ElasticBufferCircuitOpenError
+from elasticbatch.targets import Target, encode_chunks, send_chunks
+
+
+def _bulk_response(body, status=201):
+    """
+    Return bulk response for a serialized bulk request body of index actions
+    """
+    n_docs = len(body.splitlines()) // 2
+    return {'took': 1, 'errors': status >= 300, 'items': [{'index': {'status': status}}] * n_docs}
+
+
+class TestEncodeChunks(unittest.TestCase):
+
+    docs = [{'_index': 'idx', 'a': i} for i in range(5)]
+
+    def test_encode_chunks(self):
+
+        class TestCase:
+            def __init__(self, chunk_size, max_chunk_bytes, expected_n_docs):
+                self.chunk_size = chunk_size
+                self.max_chunk_bytes = max_chunk_bytes
+                self.expected_n_docs = expected_n_docs
+
+        doc_bytes = 35  # action and source lines of each document, including newlines
+        tests = {
+            'single chunk': TestCase(
+                chunk_size=10,
+                max_chunk_bytes=1000,
+                expected_n_docs=[5],
+            ),
+            'limited by chunk size': TestCase(
+                chunk_size=2,
+                max_chunk_bytes=1000,
+                expected_n_docs=[2, 2, 1],
+            ),
+            'limited by bytes': TestCase(
+                chunk_size=10,
+                max_chunk_bytes=3 * doc_bytes,
+                expected_n_docs=[3, 2],
+            ),
+            'document larger than bytes': TestCase(
+                chunk_size=10,
+                max_chunk_bytes=1,
+                expected_n_docs=[1, 1, 1, 1, 1],
+            ),
+        }
+
+        for test_name, test in tests.items():
+            chunks = list(encode_chunks(
+                self.docs, JSONSerializer(), test.chunk_size, test.max_chunk_bytes))
+
+            self.assertListEqual([len(chunk) for chunk, _ in chunks], test.expected_n_docs,
+                                 test_name)
+            docs = [doc for chunk, _ in chunks for doc in chunk]
+            self.assertEqual(docs[0], '{"index":{"_index":"idx"}}\n{"a":0}\n', test_name)
+            self.assertEqual(len(docs), len(self.docs), test_name)
+            for chunk, n_bytes in chunks:
+                self.assertEqual(n_bytes, len(chunk) * doc_bytes, test_name)
+                if test.max_chunk_bytes > doc_bytes:
+                    self.assertLessEqual(n_bytes, test.max_chunk_bytes, test_name)
+
+
+class TestSendChunks(unittest.TestCase):
+
+    chunks = [['{"index":{}}\n{"a":1}\n', '{"index":{}}\n{"a":2}\n'], ['{"index":{}}\n{"a":3}\n']]
+
+    @patch('time.sleep')
+    def test_send_chunks(self, mock_sleep):
+
+        class TestCase:
+            def __init__(
+                self,
+                side_effect,
+                bulk_kwargs,
+                expected_n_success=3,
+                expected_n_errors=0,
+                expected_err=None,
+                expected_sleeps=(),
+                expected_bodies=None,
+            ):
+                self.side_effect = side_effect
+                self.bulk_kwargs = bulk_kwargs
+                self.expected_n_success = expected_n_success
+                self.expected_n_errors = expected_n_errors
+                self.expected_err = expected_err
+                self.expected_sleeps = list(expected_sleeps)
+                self.expected_bodies = expected_bodies
+
+        def _items(*statuses):
+            return {'items': [{'index': {'status': status}} for status in statuses]}
+
+        doc1, doc2 = self.chunks[0]
+        doc3, = self.chunks[1]
+        rejected = TransportError(429, 'es_rejected_execution_exception')
+        tests = {
+            'success': TestCase(
+                side_effect=lambda body, **kwargs: _bulk_response(body),
+                bulk_kwargs={'chunk_size': 1, 'max_retries': 3},
+                expected_bodies=[doc1 + doc2, doc3],
+            ),
+            'document errors': TestCase(
+                side_effect=lambda body, **kwargs: _bulk_response(body, status=400),
+                bulk_kwargs={},
+                expected_n_success=0,
+                expected_n_errors=3,
+            ),
+            'retried request rejection': TestCase(
+                side_effect=[rejected, _items(201, 201), _items(201)],
+                bulk_kwargs={'max_retries': 1},
+                expected_sleeps=[2],
+                expected_bodies=[doc1 + doc2, doc1 + doc2, doc3],
+            ),
+            'request rejection exceeding retries': TestCase(
+                side_effect=[rejected, rejected],
+                bulk_kwargs={'max_retries': 1},
+                expected_err=TransportError,
+                expected_sleeps=[2],
+            ),
+            'retried document rejections with backoff': TestCase(
+                side_effect=[_items(429, 201), _items(429), _items(201), _items(201)],
+                bulk_kwargs={'max_retries': 3, 'initial_backoff': 1, 'max_backoff': 1.5},
+                expected_sleeps=[1, 1.5],
+                expected_bodies=[doc1 + doc2, doc1, doc1, doc3],
+            ),
+            'document rejections exceeding retries': TestCase(
+                side_effect=[_items(429, 201), _items(429), _items(201)],
+                bulk_kwargs={'max_retries': 1},
+                expected_n_success=2,
+                expected_n_errors=1,
+                expected_sleeps=[2],
+                expected_bodies=[doc1 + doc2, doc1, doc3],
+            ),
+            'error not retried': TestCase(
+                side_effect=TransportError(400, 'bad request'),
+                bulk_kwargs={'max_retries': 3},
+                expected_err=TransportError,
+            ),
+        }
+
+        for test_name, test in tests.items():
+            mock_sleep.reset_mock()
+            client = MagicMock()
+            client.bulk.side_effect = test.side_effect
+
+            if test.expected_err:
+                with self.assertRaises(test.expected_err, msg=test_name):
+                    send_chunks(client, self.chunks, test.bulk_kwargs)
+            else:
+                n_success, errors = send_chunks(client, self.chunks, test.bulk_kwargs)
+                self.assertEqual(n_success, test.expected_n_success, test_name)
+                self.assertEqual(len(errors), test.expected_n_errors, test_name)
+                for _, kwargs in client.bulk.call_args_list:
+                    self.assertNotIn('chunk_size', kwargs, test_name)
+                    self.assertNotIn('max_retries', kwargs, test_name)
+            if test.expected_bodies is not None:
+                bodies = [kwargs['body'] for _, kwargs in client.bulk.call_args_list]
+                self.assertListEqual(bodies, test.expected_bodies, test_name)
+            sleeps = [args[0] for args, _ in mock_sleep.call_args_list]
+            self.assertListEqual(sleeps, test.expected_sleeps, test_name)
+
+
+class TestTarget(unittest.TestCase):
+
+    chunks = [['{"index":{}}\n{"a":1}\n']]
+
+    @staticmethod
+    def _target(side_effect=None, **kwargs):
+        target = Target('test', **kwargs)
+        target._client = MagicMock()
+        target._client.bulk.side_effect = side_effect or (
+            lambda body, **kwargs: _bulk_response(body))
+        return target
+
+    def test_init(self):
+        with self.assertRaises(ValueError):
+            Target('test', role='primary')
+        with self.assertRaises(ValueError):
+            Target('test', max_pending=0)
+
+    def test_send(self):
+        target = self._target()
+
+        self.assertEqual(target.send(self.chunks, {}), (1, []))
+        self.assertEqual((target.n_success, target.n_errors, target.last_error), (1, 0, None))
+
+        target._client.bulk.side_effect = ESConnectionError('N/A', 'connection refused')
+        with self.assertRaises(ESConnectionError):
+            target.send(self.chunks, {})
+        self.assertEqual((target.n_success, target.n_errors), (1, 1))
+        self.assertIsInstance(target.last_error, ESConnectionError)
+
+    def test_send_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        target = self._target(
+            side_effect=ESConnectionError('N/A', 'connection refused'),
+            circuit_breaker=breaker,
+        )
+
+        self.assertTrue(target.available)
+        with self.assertRaises(ESConnectionError):
+            target.send(self.chunks, {})
+        self.assertFalse(target.available)
+        with self.assertRaises(ElasticBufferCircuitOpenError):
+            target.send(self.chunks, {})
+        self.assertEqual(target._client.bulk.call_count, 1)
+        self.assertEqual(target.n_errors, 2)
+
+    def test_submit(self):
+        target = self._target(max_pending=1)
+
+        futures = [target.submit(self.chunks[0], {}) for _ in range(3)]
+        target.wait()
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(target.n_success, 3)
+        self.assertEqual(len(target._pending), 0)
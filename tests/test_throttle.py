@@ -0,0 +1,115 @@
+import threading
+import unittest
+
+from elasticbatch.throttle import Throttle
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.now += seconds
+
+
+class TestThrottle(unittest.TestCase):
+
+    def test_acquire(self):
+
+        class TestCase:
+            def __init__(self, docs_per_sec, bytes_per_sec, requests, expected_waits, burst=1.0):
+                self.clock = FakeClock()
+                self.throttle = Throttle(
+                    docs_per_sec=docs_per_sec,
+                    bytes_per_sec=bytes_per_sec,
+                    burst=burst,
+                    clock=self.clock,
+                    sleep=self.clock.sleep,
+                )
+                self.requests = requests
+                self.expected_waits = expected_waits
+
+        tests = {
+            'no limits': TestCase(
+                docs_per_sec=None,
+                bytes_per_sec=None,
+                requests=[(1000, 10**6)] * 3,
+                expected_waits=[0, 0, 0],
+            ),
+            'docs within burst': TestCase(
+                docs_per_sec=10,
+                bytes_per_sec=None,
+                requests=[(5, 0), (5, 0)],
+                expected_waits=[0, 0],
+            ),
+            'docs exceeding burst': TestCase(
+                docs_per_sec=10,
+                bytes_per_sec=None,
+                requests=[(10, 0), (5, 0), (10, 0)],
+                expected_waits=[0, 0.5, 1.0],
+            ),
+            'bytes exceeding burst': TestCase(
+                docs_per_sec=None,
+                bytes_per_sec=100,
+                requests=[(1, 300)],
+                expected_waits=[2.0],
+            ),
+            'stricter of docs and bytes limits': TestCase(
+                docs_per_sec=10,
+                bytes_per_sec=100,
+                requests=[(20, 150)],
+                expected_waits=[1.0],
+            ),
+            'larger burst': TestCase(
+                docs_per_sec=10,
+                bytes_per_sec=None,
+                burst=3.0,
+                requests=[(30, 0), (10, 0)],
+                expected_waits=[0, 1.0],
+            ),
+        }
+
+        for test_name, test in tests.items():
+            waits = [test.throttle.acquire(n_docs, n_bytes) for n_docs, n_bytes in test.requests]
+            for wait, expected_wait in zip(waits, test.expected_waits):
+                self.assertAlmostEqual(wait, expected_wait, places=6, msg=test_name)
+
+    def test_acquire_refills_over_time(self):
+        clock = FakeClock()
+        throttle = Throttle(docs_per_sec=10, clock=clock, sleep=clock.sleep)
+
+        self.assertEqual(throttle.acquire(10), 0)
+        clock.now += 0.5
+        self.assertEqual(throttle.acquire(5), 0)
+        clock.now += 10
+        self.assertEqual(throttle.acquire(10), 0, 'tokens should not exceed burst capacity')
+        self.assertAlmostEqual(throttle.acquire(1), 0.1, places=6)
+
+    def test_change_limits(self):
+        clock = FakeClock()
+        throttle = Throttle(docs_per_sec=10, clock=clock, sleep=clock.sleep)
+
+        throttle.docs_per_sec = None
+        self.assertEqual(throttle.acquire(1000), 0, 'no limit after removing limit')
+
+        throttle.docs_per_sec = 100
+        self.assertAlmostEqual(throttle.acquire(50), 0.5, places=6)
+
+        throttle.bytes_per_sec = 10
+        self.assertTrue(throttle.limits_bytes)
+        self.assertAlmostEqual(throttle.acquire(0, 10), 1.0, places=6)
+
+    def test_invalid_limits(self):
+        for kwargs in [{'docs_per_sec': 0}, {'bytes_per_sec': -1}, {'burst': 0}]:
+            with self.assertRaises(ValueError, msg=kwargs):
+                _ = Throttle(**kwargs)
+
+        throttle = Throttle()
+        with self.assertRaises(ValueError):
+            throttle.docs_per_sec = 0
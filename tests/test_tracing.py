@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import MagicMock
+
+from elasticbatch.tracing import CallbackTracer, OpenTelemetryTracer, TracedClient, Tracer
+
+
+class FakeClock:
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class TestTracer(unittest.TestCase):
+
+    def test_init_without_span(self):
+
+        class IncompleteTracer(Tracer):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteTracer()
+
+
+class TestCallbackTracer(unittest.TestCase):
+
+    def test_span(self):
+        callback = MagicMock()
+        tracer = CallbackTracer(callback, clock=FakeClock(step=0.5))
+
+        with tracer.span('outer', a=1) as attributes:
+            attributes['b'] = 2
+            with tracer.span('inner'):
+                pass
+
+        callback.assert_any_call('inner', 0.5, {})
+        callback.assert_called_with('outer', 1.5, {'a': 1, 'b': 2})
+
+    def test_span_error(self):
+        callback = MagicMock()
+        tracer = CallbackTracer(callback, clock=FakeClock(step=1))
+
+        with self.assertRaises(ValueError):
+            with tracer.span('failing'):
+                raise ValueError('bad value')
+
+        callback.assert_called_once_with('failing', 1, {'error': 'ValueError: bad value'})
+
+
+class TestOpenTelemetryTracer(unittest.TestCase):
+
+    def test_span(self):
+        otel_tracer = MagicMock()
+        span = otel_tracer.start_as_current_span.return_value.__enter__.return_value
+        tracer = OpenTelemetryTracer(otel_tracer)
+
+        with tracer.span('flush', n_docs=10) as attributes:
+            attributes['took'] = 5
+            attributes['unset'] = None
+
+        otel_tracer.start_as_current_span.assert_called_once_with('elasticbatch.flush')
+        set_calls = [args for args, _ in span.set_attribute.call_args_list]
+        self.assertListEqual(set_calls, [('n_docs', 10), ('took', 5)])
+
+
+class TestTracedClient(unittest.TestCase):
+
+    def test_bulk(self):
+        client = MagicMock()
+        client.bulk.return_value = {'took': 7, 'errors': False, 'items': [{}, {}]}
+        callback = MagicMock()
+
+        traced = TracedClient(client, CallbackTracer(callback, clock=FakeClock(step=1)))
+        resp = traced.bulk(body='{"index":{}}\n{"a":"é"}\n')
+
+        self.assertIs(resp, client.bulk.return_value)
+        client.bulk.assert_called_once_with(body='{"index":{}}\n{"a":"é"}\n')
+        callback.assert_called_once_with('bulk_request', 1, {
+            'body_bytes': 24,
+            'took': 7,
+            'errors': False,
+            'n_items': 2,
+        })
+
+    def test_delegates_attributes(self):
+        client = MagicMock()
+        traced = TracedClient(client, CallbackTracer(MagicMock()))
+        self.assertIs(traced.transport, client.transport)